@@ -0,0 +1,241 @@
+import functools
+import glob
+import os
+import re
+import sqlite3
+import time
+
+import pandas as pd
+
+from instrumentation import METRICS
+from storage.outputs import OUTPUT_DIR, read_frame, replace_partition
+from storage.raw_store import DEFAULT_RAW_STORE_PATH, RawStore
+
+DEFAULT_CHECKPOINT_PATH = os.getenv("BACKFILL_CHECKPOINT_PATH", "data/backfill_checkpoints.sqlite")
+ORIGINS = ("store", "outputs", "excel")
+
+# Per-source settings: timestamp column, daily stats dataset and the Excel
+# report names process_ticker writes
+SOURCES = {
+    "news": {"date_column": "publishedDate", "daily_dataset": "news_daily", "excel": "news/{ticker}_news_data.xlsx"},
+    "reddit": {"date_column": "date", "daily_dataset": "reddit_daily", "excel": "reddit/{ticker}_social_data.xlsx"},
+}
+
+# Set by _init_worker in each worker process
+_WORKER = {}
+
+
+class Checkpoints:
+    """
+    Finished shards per model revision, in SQLite so every worker process
+    can record its own progress. A shard is done only for the revision it
+    was scored with, so changing model settings re-runs everything.
+    """
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS backfill_shards (
+                source TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                month TEXT NOT NULL,
+                origin TEXT NOT NULL,
+                revision TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                rescored INTEGER NOT NULL,
+                finished_at REAL NOT NULL,
+                PRIMARY KEY (source, ticker, month, origin)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def done(self, shard, revision):
+        row = self._conn.execute(
+            "SELECT revision FROM backfill_shards WHERE source = ? AND ticker = ? AND month = ? AND origin = ?",
+            shard,
+        ).fetchone()
+        return row is not None and row[0] == revision
+
+    def mark(self, shard, revision, rows, rescored):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO backfill_shards VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (*shard, revision, rows, rescored, time.time()),
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+def _month_of(values):
+    return pd.to_datetime(values).dt.strftime("%Y-%m")
+
+
+@functools.lru_cache(maxsize=8)
+def _read_excel(path):
+    return pd.read_excel(path)
+
+
+def list_shards(sources, origin="store", tickers=None, start=None, end=None, raw_store_path=DEFAULT_RAW_STORE_PATH,
+                base_dir=OUTPUT_DIR, excel_dir="."):
+    """
+    Find the (source, ticker, month, origin) shards to re-score.
+    Shards are whole months, so months that only overlap [start, end] are
+    still processed in full and their partitions stay complete.
+    """
+    first = start[:7] if start else "0000-00"
+    last = end[:7] if end else "9999-99"
+    shards = []
+    for source in sources:
+        if origin == "store":
+            store = RawStore(raw_store_path)
+            months = [(t, m) for t, m, _ in store.months(source, tickers)]
+            store.close()
+        elif origin == "outputs":
+            pattern = os.path.join(base_dir, f"{source}.parquet", "ticker=*", "month=*")
+            partitions = [re.search(r"ticker=([^/\\]+)[/\\]month=([\d-]+)$", p) for p in glob.glob(pattern)]
+            months = sorted((p[1], p[2]) for p in partitions if p and (tickers is None or p[1] in tickers))
+        elif origin == "excel":
+            months = []
+            suffix = SOURCES[source]["excel"].split("{ticker}")[1]
+            for path in sorted(glob.glob(os.path.join(excel_dir, SOURCES[source]["excel"].format(ticker="*")))):
+                ticker = os.path.basename(path)[:-len(suffix)]
+                if tickers is None or ticker in tickers:
+                    dates = _read_excel(path)[SOURCES[source]["date_column"]]
+                    months += [(ticker, m) for m in sorted(_month_of(dates).dropna().unique())]
+        else:
+            raise ValueError(f"Unknown origin '{origin}', expected one of {ORIGINS}")
+        shards += [(source, t, m, origin) for t, m in months if first <= m <= last]
+    return shards
+
+
+def load_shard(shard, raw_store_path=DEFAULT_RAW_STORE_PATH, base_dir=OUTPUT_DIR, excel_dir="."):
+    """Read one shard's stored rows, from local data only."""
+    source, ticker, month, origin = shard
+    if origin == "store":
+        store = RawStore(raw_store_path)
+        try:
+            return store.read(source, ticker, f"{month}-01", f"{month}-31")
+        finally:
+            store.close()
+    if origin == "outputs":
+        return read_frame(source, ticker, fmt="parquet", base_dir=base_dir, months=[month])
+    df = _read_excel(os.path.join(excel_dir, SOURCES[source]["excel"].format(ticker=ticker)))
+    return df[_month_of(df[SOURCES[source]["date_column"]]) == month].reset_index(drop=True)
+
+
+def _init_worker(checkpoint_path, tiered_reddit, paths):
+    from sentiment.finbert import MAX_LENGTH, MAX_WINDOWS, _cache_revision, warm_up
+
+    classifier = warm_up()
+    revision = f"{classifier.model.config.name_or_path}@{_cache_revision(classifier, MAX_WINDOWS)}/{MAX_LENGTH}"
+    _WORKER.update(
+        classifier=classifier,
+        revision=revision,
+        checkpoints=Checkpoints(checkpoint_path),
+        tiered_reddit=tiered_reddit,
+        paths=paths,
+    )
+
+
+def run_shard(shard):
+    """
+    Re-score one shard in a worker process.
+    Every text goes through the sentiment cache, so only texts without a
+    score for the current model revision reach the model. The scored rows
+    and their daily stats replace the shard's partitions atomically, then
+    the shard is checkpointed.
+    Returns:
+        dict: shard, status ("skipped" or "done"), rows and rescored counts.
+    """
+    from news_scraper import calculate_daily_stats as calculate_news_stats, sentiment_news
+    from reddit_scraper import calculate_daily_stats as calculate_reddit_stats, sentiment_reddit
+    from sentiment.finbert import analyze_sentiment_batch
+
+    source, ticker, month, origin = shard
+    checkpoints = _WORKER["checkpoints"]
+    revision = _WORKER["revision"]
+    if source == "reddit" and _WORKER["tiered_reddit"]:
+        revision += "+tiered"
+    if checkpoints.done(shard, revision):
+        return {"shard": shard, "status": "skipped", "rows": 0, "rescored": 0}
+
+    df = load_shard(shard, **_WORKER["paths"])
+    misses = METRICS.total("sentiment_cache_misses_total")
+    if not df.empty:
+        base_dir = _WORKER["paths"]["base_dir"]
+
+        # Passed as a score_fn so a scoring error fails the shard instead of
+        # replacing its partitions with unscored rows
+        def score_fn(texts):
+            return analyze_sentiment_batch(texts, classifier=_WORKER["classifier"])
+
+        if source == "news":
+            df = sentiment_news(df, score_fn=score_fn)
+            stats = calculate_news_stats(df)
+        else:
+            df = sentiment_reddit(df, score_fn=score_fn, tiered=_WORKER["tiered_reddit"])
+            stats = calculate_reddit_stats(df)
+        replace_partition(df, source, ticker, month, base_dir=base_dir)
+        replace_partition(stats, SOURCES[source]["daily_dataset"], ticker, month, base_dir=base_dir)
+
+    rescored = METRICS.total("sentiment_cache_misses_total") - misses
+    checkpoints.mark(shard, revision, len(df), rescored)
+    return {"shard": shard, "status": "done", "rows": len(df), "rescored": rescored}
+
+
+def run_backfill(sources=tuple(SOURCES), origin="store", tickers=None, start=None, end=None, workers=2,
+                 tiered_reddit=True, checkpoint_path=DEFAULT_CHECKPOINT_PATH, raw_store_path=DEFAULT_RAW_STORE_PATH,
+                 base_dir=OUTPUT_DIR, excel_dir="."):
+    """
+    Re-score stored news/Reddit rows in parallel without fetching anything.
+    Rows come from the raw store, the columnar outputs or the Excel reports
+    and are split into ticker/month shards spread over `workers` processes,
+    each loading the model once. Finished shards are checkpointed per model
+    revision, so an interrupted job resumes where it stopped and a re-run
+    with unchanged settings does nothing. Scored rows go to the "news" /
+    "reddit" datasets and daily stats to "news_daily" / "reddit_daily".
+    Returns:
+        tuple: (list of shard result dicts, dict of shard -> error message)
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    paths = {"raw_store_path": raw_store_path, "base_dir": base_dir, "excel_dir": excel_dir}
+    shards = list_shards(sources, origin, tickers, start, end, **paths)
+    print(f"🗂️ Backfilling {len(shards)} shard(s) from {origin} with {workers} worker(s)")
+    if not shards:
+        return [], {}
+
+    results = []
+    failures = {}
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(checkpoint_path, tiered_reddit, paths),
+    )
+    with pool:
+        futures = {pool.submit(run_shard, shard): shard for shard in shards}
+        for future in as_completed(futures):
+            source, ticker, month, _ = shard = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ {source}/{ticker}/{month} failed: {e}")
+                failures[shard] = str(e)
+                continue
+            results.append(result)
+            if result["status"] == "done":
+                print(f"✅ {source}/{ticker}/{month}: {result['rows']} row(s), {result['rescored']} text(s) re-scored")
+
+    skipped = sum(r["status"] == "skipped" for r in results)
+    rescored = sum(r["rescored"] for r in results)
+    print(f"🏁 {len(results) - skipped} shard(s) re-scored ({rescored} texts), {skipped} already current, "
+          f"{len(failures)} failed")
+    return results, failures
@@ -0,0 +1,57 @@
+import argparse
+import json
+
+from bench.run import STAGES
+
+
+def compare(baseline, candidate, threshold=0.10):
+    """
+    Compare two benchmark reports scale by scale.
+    Returns:
+        list: (tickers, stage, metric, baseline, candidate, change, regressed)
+              rows, where change is the relative difference and regressed
+              is True when latency rose or throughput fell by more than
+              `threshold`.
+    """
+    base = {r["tickers"]: r for r in baseline["results"]}
+    rows = []
+    for result in candidate["results"]:
+        if result["tickers"] not in base:
+            continue
+        for stage in STAGES:
+            old, new = base[result["tickers"]]["stages"][stage], result["stages"][stage]
+            for metric in ("p50_ms", "p99_ms", "items_per_second"):
+                change = (new[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+                rows.append((result["tickers"], stage, metric, old[metric], new[metric], change,
+                             is_regression(metric, change, threshold)))
+    return rows
+
+
+def is_regression(metric, change, threshold=0.10):
+    return change < -threshold if metric == "items_per_second" else change > threshold
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change flagged as a regression")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"🔍 {baseline['meta']['commit']} -> {candidate['meta']['commit']}")
+    regressions = 0
+    for tickers, stage, metric, old, new, change, regressed in compare(baseline, candidate, args.threshold):
+        flag = "❌" if regressed else "  "
+        regressions += regressed
+        print(f"{flag} {tickers:>4} {stage:<10} {metric:<17} {old:>12.2f} -> {new:>12.2f} ({change:+.1%})")
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    return regressions
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if main() else 0)
@@ -0,0 +1,179 @@
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+# Endpoint paths under /stable/ that the fake FMP server replays
+NEWS_ENDPOINT = "news/stock"
+PRICE_ENDPOINT = "historical-price-eod/dividend-adjusted"
+MARKET_CAP_ENDPOINT = "historical-market-capitalization"
+
+SUBREDDITS = ["stocks", "investing", "wallstreetbets", "technology"]
+
+_POSITIVE = [
+    "{name} beat analyst expectations and raised full-year guidance.",
+    "Shares of {ticker} jumped {pct}% after a strong earnings report.",
+    "Analysts upgraded {ticker} citing record revenue growth.",
+    "{name} announced a new buyback program worth billions.",
+    "I love how {ticker} keeps crushing it, this is amazing!",
+]
+_NEGATIVE = [
+    "{name} missed estimates and cut its outlook for the year.",
+    "Shares of {ticker} fell {pct}% on weak demand.",
+    "Regulators opened an investigation into {name}.",
+    "{ticker} was downgraded after margins shrank again.",
+    "This is a terrible disaster, {ticker} bagholders are crying.",
+]
+_NEUTRAL = [
+    "{name} will report results after the close on Thursday.",
+    "{ticker} traded flat in early trading.",
+    "The company scheduled its annual shareholder meeting.",
+    "Options volume in {ticker} was in line with the average.",
+    "Anyone holding {ticker} through the weekend?",
+]
+_SYNDICATION_PREFIXES = ["(Reuters) - ", "Benzinga: ", "Click here for more. ", ""]
+
+
+def _sentence(rng, ticker):
+    pool = rng.choice([_POSITIVE, _NEGATIVE, _NEUTRAL])
+    return rng.choice(pool).format(name=f"{ticker.title()} Corp", ticker=ticker, pct=rng.randint(1, 12))
+
+
+def synthetic_text(rng, ticker, sentences):
+    """A paragraph of `sentences` random finance sentences about `ticker`."""
+    return " ".join(_sentence(rng, ticker) for _ in range(sentences))
+
+
+def _days(start_date, end_date):
+    day = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def generate_news(rng, ticker, start_date, end_date, per_day=10, duplicate_rate=0.15, long_rate=0.05):
+    """
+    FMP news/stock records, newest first. A share of the articles are
+    syndicated copies of an earlier one and a share are long enough to need
+    chunked scoring.
+    """
+    articles = []
+    for day in _days(start_date, end_date):
+        for n in range(per_day):
+            published = day + timedelta(seconds=rng.randint(0, 86399))
+            if articles and rng.random() < duplicate_rate:
+                text = rng.choice(_SYNDICATION_PREFIXES) + rng.choice(articles)["text"]
+            else:
+                text = synthetic_text(rng, ticker, 40 if rng.random() < long_rate else rng.randint(2, 6))
+            articles.append({
+                "symbol": ticker,
+                "publishedDate": published.strftime("%Y-%m-%d %H:%M:%S"),
+                "publisher": rng.choice(["Reuters", "Benzinga", "Zacks", "Motley Fool"]),
+                "title": _sentence(rng, ticker),
+                "image": None,
+                "site": "example.com",
+                "text": text,
+                "url": f"https://example.com/{ticker}/{day:%Y%m%d}/{n}",
+            })
+    return sorted(articles, key=lambda a: a["publishedDate"], reverse=True)
+
+
+def generate_prices(rng, ticker, start_date, end_date):
+    """Dividend-adjusted EOD bars on weekdays, newest first, as a random walk."""
+    price = rng.uniform(20, 500)
+    bars = []
+    for day in _days(start_date, end_date):
+        if day.weekday() >= 5:
+            continue
+        price *= 1 + rng.gauss(0, 0.015)
+        bars.append({
+            "symbol": ticker,
+            "date": day.strftime("%Y-%m-%d"),
+            "adjOpen": price,
+            "adjHigh": price * 1.01,
+            "adjLow": price * 0.99,
+            "adjClose": price,
+            "volume": rng.randint(1_000_000, 50_000_000),
+        })
+    return bars[::-1]
+
+
+def generate_market_caps(prices, shares):
+    """Market cap records matching generate_prices() output."""
+    return [{"symbol": b["symbol"], "date": b["date"], "marketCap": b["adjClose"] * shares} for b in prices]
+
+
+def generate_posts(rng, ticker, start_date, end_date, per_day=5, subreddits=SUBREDDITS):
+    """
+    Reddit submissions per subreddit, newest first, as plain dicts carrying
+    the attributes reddit_scraper reads from PRAW submissions.
+    """
+    posts = {}
+    for sub in subreddits:
+        records = []
+        for day in _days(start_date, end_date):
+            for n in range(per_day):
+                created = day + timedelta(seconds=rng.randint(0, 86399))
+                records.append({
+                    "id": f"{ticker}-{sub}-{day:%Y%m%d}-{n}",
+                    "created_utc": int((created - datetime(1970, 1, 1)).total_seconds()),
+                    "author": f"user{rng.randint(1, 5000)}",
+                    "title": _sentence(rng, ticker),
+                    "selftext": synthetic_text(rng, ticker, rng.randint(0, 3)),
+                    "url": f"https://reddit.com/r/{sub}/{ticker}/{day:%Y%m%d}/{n}",
+                    "score": rng.randint(0, 500),
+                    "num_comments": rng.randint(0, 200),
+                })
+        posts[sub] = sorted(records, key=lambda p: p["created_utc"], reverse=True)
+    return posts
+
+
+def build_fixtures(tickers, start_date, end_date, seed=0, news_per_day=10, posts_per_day=5, subreddits=SUBREDDITS):
+    """
+    Generate a deterministic synthetic corpus for `tickers`.
+    Returns:
+        dict: {"fmp": {endpoint: {ticker: records}}, "reddit": {ticker: {subreddit: posts}}}
+    """
+    rng = random.Random(seed)
+    fixtures = {"fmp": {NEWS_ENDPOINT: {}, PRICE_ENDPOINT: {}, MARKET_CAP_ENDPOINT: {}}, "reddit": {}}
+    for ticker in tickers:
+        prices = generate_prices(rng, ticker, start_date, end_date)
+        fixtures["fmp"][NEWS_ENDPOINT][ticker] = generate_news(rng, ticker, start_date, end_date, news_per_day)
+        fixtures["fmp"][PRICE_ENDPOINT][ticker] = prices
+        fixtures["fmp"][MARKET_CAP_ENDPOINT][ticker] = generate_market_caps(prices, rng.randint(10**8, 10**10))
+        fixtures["reddit"][ticker] = generate_posts(rng, ticker, start_date, end_date, posts_per_day, subreddits)
+    return fixtures
+
+
+def record_fmp_fixtures(tickers, start_date, end_date, api_key, fixtures=None, news_limit=1000):
+    """
+    Record live FMP responses into a fixtures dict (merging into `fixtures`
+    if given), so later benchmark runs can replay them offline.
+    """
+    from http_client import FMP_BASE_URL, get_json
+
+    fixtures = fixtures or {"fmp": {}, "reddit": {}}
+    for ticker in tickers:
+        for endpoint in (NEWS_ENDPOINT, PRICE_ENDPOINT, MARKET_CAP_ENDPOINT):
+            params = {"from": start_date, "to": end_date, "apikey": api_key}
+            if endpoint == NEWS_ENDPOINT:
+                params.update(symbols=ticker, limit=news_limit)
+            else:
+                params["symbol"] = ticker
+            print(f"📼 Recording {endpoint} for {ticker}")
+            data = get_json(f"{FMP_BASE_URL}/stable/{endpoint}", params=params)
+            fixtures["fmp"].setdefault(endpoint, {})[ticker] = data
+    return fixtures
+
+
+def save_fixtures(fixtures, path):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(fixtures, f)
+
+
+def load_fixtures(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,98 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from bench.corpus import NEWS_ENDPOINT
+
+
+class FakeFMPServer:
+    """
+    Local stand-in for the FMP /stable/ API that replays fixture records.
+    Responses are filtered by symbol(s), from/to and limit the way FMP does,
+    after an injected latency, and a share of requests get a 429.
+    Use as a context manager; `base_url` goes into FMP_BASE_URL.
+    Args:
+        fixtures (dict): endpoint -> ticker -> records, as in
+                         build_fixtures()["fmp"].
+        latency (float): Seconds added to every response.
+        jitter (float): Extra uniform random latency, in seconds.
+        rate_429 (float): Probability that a request is answered with 429.
+        retry_after (int): Retry-After header sent with 429s, or None.
+    """
+
+    def __init__(self, fixtures, latency=0.0, jitter=0.0, rate_429=0.0, retry_after=None, seed=0):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.calls = 0
+        self.throttled = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                status, payload = fake.respond(url.path, {k: v[0] for k, v in parse_qs(url.query).items()})
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                if status == 429 and fake.retry_after is not None:
+                    self.send_header("Retry-After", str(fake.retry_after))
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def respond(self, path, params):
+        """Return (status, payload) for one request."""
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            throttled = self._rng.random() < self.rate_429
+            self.throttled += throttled
+        if delay:
+            time.sleep(delay)
+        if throttled:
+            return 429, {"Error Message": "Limit Reach"}
+
+        endpoint = path.split("/stable/", 1)[-1]
+        records = self.fixtures.get(endpoint)
+        if records is None:
+            return 404, {"Error Message": f"Unknown endpoint {endpoint}"}
+
+        date_field = "publishedDate" if endpoint == NEWS_ENDPOINT else "date"
+        date_from, date_to = params.get("from", ""), params.get("to", "9999")
+        symbols = (params.get("symbols") or params.get("symbol", "")).split(",")
+        matched = [
+            r
+            for symbol in symbols
+            for r in records.get(symbol, [])
+            if date_from <= r[date_field][:10] <= date_to
+        ]
+        matched.sort(key=lambda r: r[date_field], reverse=True)
+        if "limit" in params:
+            matched = matched[:int(params["limit"])]
+        return 200, matched
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,71 @@
+import contextlib
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+# PRAW fetches search results in listings of this many posts
+PAGE_SIZE = 100
+
+
+class TooManyRequests(Exception):
+    """Raised by the fake search in place of an unrecoverable Reddit 429."""
+
+
+class FakeReddit:
+    """
+    Stand-in for praw.Reddit serving fixture posts.
+    search() yields newest-first like PRAW, sleeping `latency` (+ jitter)
+    before every page of PAGE_SIZE posts, and fails a page with
+    TooManyRequests with probability `rate_429`.
+    Args:
+        posts (dict): keyword -> subreddit -> post dicts, as in
+                      build_fixtures()["reddit"].
+    """
+
+    def __init__(self, posts, latency=0.0, jitter=0.0, rate_429=0.0, seed=0, **credentials):
+        self.posts = posts
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.pages = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def subreddit(self, name):
+        return SimpleNamespace(search=lambda query, **kwargs: self._search(name, query, kwargs.get("limit")))
+
+    def _page(self):
+        with self._lock:
+            self.pages += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            throttled = self._rng.random() < self.rate_429
+        if delay:
+            time.sleep(delay)
+        if throttled:
+            raise TooManyRequests("received 429 HTTP response")
+
+    def _search(self, sub, query, limit):
+        posts = self.posts.get(query, {}).get(sub, [])
+        if limit is not None:
+            posts = posts[:limit]
+        for i, post in enumerate(posts):
+            if i % PAGE_SIZE == 0:
+                self._page()
+            yield SimpleNamespace(
+                **{k: v for k, v in post.items() if k != "author"},
+                author=SimpleNamespace(name=post["author"]) if post.get("author") else None,
+            )
+
+
+@contextlib.contextmanager
+def patched_praw(reddit):
+    """Make every praw.Reddit(...) call inside the block return `reddit`."""
+    import praw
+
+    original = praw.Reddit
+    praw.Reddit = lambda *args, **kwargs: reddit
+    try:
+        yield reddit
+    finally:
+        praw.Reddit = original
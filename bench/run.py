@@ -0,0 +1,226 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from bench.corpus import NEWS_ENDPOINT, SUBREDDITS, build_fixtures, load_fixtures
+from bench.fake_fmp import FakeFMPServer
+from bench.fake_praw import FakeReddit, patched_praw
+
+STAGES = ("fetch", "score", "aggregate", "merge")
+DEFAULT_SCALES = (1, 10, 100)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _summarize(latencies, items):
+    latencies = np.asarray(latencies)
+    total = float(latencies.sum())
+    p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0.0, 0.0)
+    return {
+        "p50_ms": float(p50) * 1000,
+        "p99_ms": float(p99) * 1000,
+        "mean_ms": float(latencies.mean()) * 1000 if len(latencies) else 0.0,
+        "total_s": total,
+        "items": int(items),
+        "items_per_second": items / total if total else 0.0,
+    }
+
+
+def run_ticker(ticker, start_date, end_date, classifier, subreddits=SUBREDDITS):
+    """
+    Run fetch -> score -> aggregate -> merge for one ticker the way
+    process_ticker does, minus the raw store and output writes.
+    Returns:
+        tuple: (dict of stage -> seconds, dict of stage -> items processed)
+    """
+    from financials_scraper import fetch_financials_data
+    from main import create_mega_df
+    from news_scraper import calculate_daily_stats as calculate_news_stats, fetch_fmp_news, sentiment_news
+    from reddit_scraper import calculate_daily_stats as calculate_reddit_stats, fetch_reddit_posts, sentiment_reddit
+
+    seconds, items = {}, {}
+
+    started = time.perf_counter()
+    news_df, _ = fetch_fmp_news(ticker, start_date, end_date, "bench")
+    posts_df = fetch_reddit_posts(
+        None, None, None, ticker, subreddits,
+        datetime.strptime(start_date, "%Y-%m-%d"), datetime.strptime(end_date, "%Y-%m-%d"),
+    )
+    financials_df = fetch_financials_data(ticker, start_date, end_date, "bench")
+    seconds["fetch"] = time.perf_counter() - started
+    items["fetch"] = len(news_df) + len(posts_df) + len(financials_df)
+
+    started = time.perf_counter()
+    news_df = sentiment_news(news_df, classifier) if not news_df.empty else None
+    posts_df = sentiment_reddit(posts_df, classifier, tiered=True) if not posts_df.empty else None
+    seconds["score"] = time.perf_counter() - started
+    items["score"] = sum(len(df) for df in (news_df, posts_df) if df is not None)
+
+    started = time.perf_counter()
+    news_stats = calculate_news_stats(news_df) if news_df is not None else None
+    social_stats = calculate_reddit_stats(posts_df) if posts_df is not None else None
+    seconds["aggregate"] = time.perf_counter() - started
+    items["aggregate"] = items["score"]
+
+    started = time.perf_counter()
+    mega_df = create_mega_df(news_stats, social_stats, financials_df)
+    seconds["merge"] = time.perf_counter() - started
+    items["merge"] = len(mega_df)
+
+    return seconds, items
+
+
+def run_benchmark(scales=DEFAULT_SCALES, start_date="2025-05-01", end_date="2025-05-14", fixtures=None, latency=0.0,
+                  jitter=0.0, rate_429=0.0, news_per_day=10, posts_per_day=5, seed=0, verbose=False):
+    """
+    Benchmark the pipeline against the fake FMP server and fake PRAW.
+    Every scale uses its own tickers so HTTP and sentiment caches start cold.
+    Call from a fresh process after setting FMP_CALLS_PER_MINUTE and the
+    cache paths (main() does this), since those are read at import time.
+    Args:
+        scales (tuple): Ticker counts to run.
+        fixtures (dict): Recorded or synthetic fixtures; built when None.
+            With fixtures, scale n uses the first n tickers that have news.
+        latency, jitter (float): Injected seconds per HTTP request / Reddit page.
+        rate_429 (float): Share of requests answered with 429.
+    Returns:
+        dict: {"meta": {...}, "results": [per-scale summary, ...]}
+    """
+    import financials_scraper
+    import news_scraper
+    from sentiment.finbert import BACKEND, MODEL_NAME, warm_up
+
+    if fixtures is None:
+        tickers = {n: [f"B{n:03d}X{i:03d}" for i in range(n)] for n in scales}
+        fixtures = build_fixtures(
+            [t for names in tickers.values() for t in names], start_date, end_date, seed, news_per_day, posts_per_day
+        )
+    else:
+        recorded = sorted(fixtures["fmp"][NEWS_ENDPOINT])
+        tickers = {n: recorded[:n] for n in scales}
+
+    quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    classifier = warm_up()
+    reddit = FakeReddit(fixtures.get("reddit", {}), latency, jitter, rate_429, seed)
+
+    results = []
+    with FakeFMPServer(fixtures["fmp"], latency, jitter, rate_429, retry_after=0, seed=seed) as server, patched_praw(reddit):
+        news_scraper.FMP_BASE_URL = financials_scraper.FMP_BASE_URL = server.base_url
+        for n in scales:
+            print(f"⏱️ Benchmarking {n} ticker(s)...")
+            latencies = {stage: [] for stage in STAGES}
+            items = dict.fromkeys(STAGES, 0)
+            failures = {}
+            calls, pages = server.calls, reddit.pages
+
+            started = time.perf_counter()
+            for ticker in tickers[n]:
+                try:
+                    with quiet:
+                        seconds, counts = run_ticker(ticker, start_date, end_date, classifier)
+                except Exception as e:
+                    failures[ticker] = str(e)
+                    continue
+                for stage in STAGES:
+                    latencies[stage].append(seconds[stage])
+                    items[stage] += counts[stage]
+            wall = time.perf_counter() - started
+
+            results.append({
+                "tickers": n,
+                "wall_seconds": wall,
+                "tickers_per_second": (n - len(failures)) / wall if wall else 0.0,
+                "http_calls": server.calls - calls,
+                "reddit_pages": reddit.pages - pages,
+                "failures": failures,
+                "stages": {stage: _summarize(latencies[stage], items[stage]) for stage in STAGES},
+            })
+            print(json.dumps(results[-1]["stages"], indent=2))
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "model": MODEL_NAME,
+            "backend": BACKEND,
+            "start_date": start_date,
+            "end_date": end_date,
+            "latency": latency,
+            "jitter": jitter,
+            "rate_429": rate_429,
+            "news_per_day": news_per_day,
+            "posts_per_day": posts_per_day,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the stock-engine pipeline offline.")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)), help="Comma-separated ticker counts")
+    parser.add_argument("--start-date", default="2025-05-01")
+    parser.add_argument("--end-date", default="2025-05-14")
+    parser.add_argument("--fixtures", help="JSON fixtures to replay instead of a synthetic corpus")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random seconds per request")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--news-per-day", type=int, default=10)
+    parser.add_argument("--posts-per-day", type=int, default=5)
+    parser.add_argument("--calls-per-minute", type=int, default=60_000, help="FMP rate limit to apply")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result path; defaults to bench/results/<time>-<commit>.json")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output")
+    args = parser.parse_args(argv)
+
+    # Read at import time by the pipeline modules; caches start empty every run
+    scratch = tempfile.mkdtemp(prefix="stock-engine-bench-")
+    os.environ["FMP_CALLS_PER_MINUTE"] = str(args.calls_per_minute)
+    os.environ["HTTP_CACHE_PATH"] = os.path.join(scratch, "http_cache.sqlite")
+    os.environ["SENTIMENT_CACHE_PATH"] = os.path.join(scratch, "sentiment.sqlite")
+
+    report = run_benchmark(
+        scales=tuple(int(s) for s in args.scales.split(",")),
+        start_date=args.start_date,
+        end_date=args.end_date,
+        fixtures=load_fixtures(args.fixtures) if args.fixtures else None,
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_429=args.rate_429,
+        news_per_day=args.news_per_day,
+        posts_per_day=args.posts_per_day,
+        seed=args.seed,
+        verbose=args.verbose,
+    )
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{report['meta']['commit']}.json"
+    )
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Benchmark results saved to {output}")
+    return output
+
+
+if __name__ == "__main__":
+    main()
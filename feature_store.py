@@ -0,0 +1,336 @@
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from storage.outputs import OUTPUT_DIR, OUTPUT_FORMAT, read_frame, write_frame
+
+DEFAULT_FEATURE_STATE_PATH = os.getenv("FEATURE_STATE_PATH", "data/feature_state.sqlite")
+DATASET = "features"
+
+EMA_SPANS = (5, 20)
+ZSCORE_WINDOW = 20
+MOMENTUM_DAYS = (5, 20)
+PRICE_COLUMN = "stock_price"
+SENTIMENT_COLUMNS = ("news_sentiment", "reddit_sentiment")
+VOLUME_COLUMNS = ("num_articles", "reddit_post_volume")
+INPUT_COLUMNS = (PRICE_COLUMN,) + SENTIMENT_COLUMNS + VOLUME_COLUMNS
+
+# Per-day states kept for the newest days of each ticker. Recent days are
+# re-fetched (see RawStore.missing_days), so a run that revises them resumes
+# from the state just before the first changed day instead of from scratch.
+STATE_RETENTION_DAYS = int(os.getenv("FEATURE_STATE_RETENTION_DAYS", "5"))
+
+# Stored states are only valid for the feature settings they were built with
+PARAMS = json.dumps({
+    "ema_spans": EMA_SPANS,
+    "zscore_window": ZSCORE_WINDOW,
+    "momentum_days": MOMENTUM_DAYS,
+    "inputs": INPUT_COLUMNS,
+})
+
+
+def feature_columns():
+    """Names of the feature columns, in the order they are stored."""
+    columns = ["time"]
+    columns += [f"{c}_ema{span}" for c in SENTIMENT_COLUMNS for span in EMA_SPANS]
+    columns += [f"{c}_z{ZSCORE_WINDOW}" for c in VOLUME_COLUMNS]
+    columns += [f"momentum{days}" for days in MOMENTUM_DAYS]
+    columns += [f"{c}_expanding_mean" for c in SENTIMENT_COLUMNS]
+    return columns
+
+
+def _inputs(frame):
+    """One row per trading day with 'date' and INPUT_COLUMNS (NaN when absent)."""
+    inputs = frame.reindex(columns=["date", *INPUT_COLUMNS]).copy()
+    inputs["date"] = pd.to_datetime(inputs["date"]).dt.normalize().astype("datetime64[ns]")
+    inputs[list(INPUT_COLUMNS)] = inputs[list(INPUT_COLUMNS)].astype(float)
+    inputs = inputs.dropna(subset=["date"]).drop_duplicates("date", keep="last")
+    return inputs.sort_values("date").reset_index(drop=True)
+
+
+def _warm(values, history):
+    """`values` as floats, preceded by the warm-up values carried in a state."""
+    return pd.Series(np.concatenate([np.asarray(history, dtype=float), values.to_numpy(dtype=float)]))
+
+
+def _value(x):
+    return None if pd.isna(x) else float(x)
+
+
+def compute_features(inputs, state=None, keep=STATE_RETENTION_DAYS):
+    """
+    Compute the rolling and expanding features for consecutive trading days
+    of one ticker, continuing from the state left by the day before.
+    Each feature only uses that day and earlier ones. The state carries what
+    the windows need (last EMA values, the last ZSCORE_WINDOW - 1 volumes,
+    the last max(MOMENTUM_DAYS) prices, running sums), so its size does not
+    grow with history, and it is prepended to the new days so the vectorized
+    result matches a full recompute.
+    Args:
+        inputs (DataFrame): 'date' and INPUT_COLUMNS, sorted by date.
+        state (dict): State after the previous day, or None to start fresh.
+        keep (int): Return the states after each of the last `keep` days.
+    Returns:
+        tuple: (DataFrame of 'date', INPUT_COLUMNS and feature_columns(),
+                list of (date, state) for the last `keep` days)
+    """
+    state = state or {}
+    inputs = inputs.reset_index(drop=True)
+    n = len(inputs)
+    features = inputs.copy()
+    features["time"] = state.get("n", 0) + np.arange(1, n + 1)
+
+    warmed = {}
+    for column in SENTIMENT_COLUMNS:
+        for span in EMA_SPANS:
+            name = f"{column}_ema{span}"
+            previous = state.get("ema", {}).get(name)
+            values = _warm(inputs[column], [] if previous is None else [previous])
+            ema = values.ewm(span=span, adjust=False, ignore_na=True).mean()
+            features[name] = ema.to_numpy()[len(values) - n:]
+
+    for column in VOLUME_COLUMNS:
+        history = state.get("window", {}).get(column, [])
+        values = _warm(inputs[column], history)
+        rolling = values.rolling(ZSCORE_WINDOW, min_periods=2)
+        mean, std = rolling.mean(), rolling.std()
+        features[f"{column}_z{ZSCORE_WINDOW}"] = ((values - mean) / std).where(std > 0).to_numpy()[len(history):]
+        warmed[column] = values.to_numpy()
+
+    history = state.get("prices", [])
+    prices = _warm(inputs[PRICE_COLUMN], history)
+    for days in MOMENTUM_DAYS:
+        features[f"momentum{days}"] = (prices / prices.shift(days) - 1).to_numpy()[len(history):]
+    warmed[PRICE_COLUMN] = prices.to_numpy()
+
+    sums = {}
+    for column in SENTIMENT_COLUMNS:
+        total, count = state.get("sums", {}).get(column, (0.0, 0))
+        running = _warm(inputs[column].fillna(0.0), [total]).cumsum().to_numpy()[1:]
+        counts = count + inputs[column].notna().cumsum().to_numpy()
+        features[f"{column}_expanding_mean"] = np.where(counts > 0, running / np.maximum(counts, 1), np.nan)
+        sums[column] = (running, counts)
+
+    states = []
+    for i in range(max(n - keep, 0), n):
+        window = {
+            c: warmed[c][:len(warmed[c]) - n + i + 1][-(ZSCORE_WINDOW - 1):].tolist() for c in VOLUME_COLUMNS
+        }
+        recent_prices = warmed[PRICE_COLUMN][:len(warmed[PRICE_COLUMN]) - n + i + 1][-max(MOMENTUM_DAYS):]
+        states.append((inputs["date"].iloc[i], {
+            "n": int(features["time"].iloc[i]),
+            "inputs": {c: _value(inputs[c].iloc[i]) for c in INPUT_COLUMNS},
+            "ema": {
+                f"{c}_ema{span}": _value(features[f"{c}_ema{span}"].iloc[i])
+                for c in SENTIMENT_COLUMNS for span in EMA_SPANS
+            },
+            "window": window,
+            "prices": recent_prices.tolist(),
+            "sums": {c: (float(sums[c][0][i]), int(sums[c][1][i])) for c in SENTIMENT_COLUMNS},
+        }))
+    return features, states
+
+
+class FeatureStore:
+    """
+    Materialized per-ticker features for model inputs.
+    Feature rows live in the columnar output store as the "features"
+    dataset; SQLite keeps each ticker's states for its newest
+    STATE_RETENTION_DAYS days. New days are computed from the last state, so
+    a daily update costs O(new days) rather than O(history). Changed inputs
+    on a retained day resume from the day before it; older changes, a start
+    date earlier than the stored history or new feature settings fall back
+    to a full rebuild.
+    """
+
+    def __init__(self, path=DEFAULT_FEATURE_STATE_PATH, fmt=OUTPUT_FORMAT, base_dir=OUTPUT_DIR):
+        self.path = path
+        self.fmt = fmt
+        self.base_dir = base_dir
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS feature_state (
+                ticker TEXT NOT NULL,
+                date TEXT NOT NULL,
+                state TEXT NOT NULL,
+                PRIMARY KEY (ticker, date)
+            );
+            CREATE TABLE IF NOT EXISTS feature_tickers (
+                ticker TEXT PRIMARY KEY,
+                first_date TEXT NOT NULL,
+                last_date TEXT NOT NULL,
+                params TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def _meta(self, ticker):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT first_date, last_date, params FROM feature_tickers WHERE ticker = ?", (ticker,)
+            ).fetchone()
+
+    def _states(self, ticker):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, state FROM feature_state WHERE ticker = ? ORDER BY date", (ticker,)
+            ).fetchall()
+        return [(pd.Timestamp(d), json.loads(s)) for d, s in rows]
+
+    def _read(self, ticker, months=None):
+        try:
+            df = read_frame(DATASET, ticker, fmt=self.fmt, base_dir=self.base_dir, months=months)
+        except (FileNotFoundError, OSError):
+            return pd.DataFrame(columns=["date", *INPUT_COLUMNS])
+        df["date"] = pd.to_datetime(df["date"]).astype("datetime64[ns]")
+        return df.drop(columns=["ticker"], errors="ignore").sort_values("date").reset_index(drop=True)
+
+    @staticmethod
+    def _changed_from(inputs, states):
+        """
+        First incoming day that is new or differs from its retained state.
+        Days older than the retained ones are taken as unchanged.
+        Returns:
+            Timestamp: The day, or None when nothing changed.
+        """
+        stored = pd.DataFrame(
+            [{"date": d, **s["inputs"]} for d, s in states], columns=["date", *INPUT_COLUMNS]
+        )
+        recent = inputs[inputs["date"] >= states[0][0]]
+        both = recent.merge(stored, on="date", how="left", suffixes=("", "_stored"), indicator=True)
+        changed = both["_merge"] == "left_only"
+        for column in INPUT_COLUMNS:
+            new, old = both[column], both[f"{column}_stored"]
+            changed |= (new != old) & ~(new.isna() & old.isna())
+        return both.loc[changed, "date"].min() if changed.any() else None
+
+    def update(self, ticker, frame):
+        """
+        Bring one ticker's features up to date with a merged daily frame.
+        Args:
+            ticker (str): Ticker the rows belong to.
+            frame (DataFrame): Daily rows with 'date' and any of INPUT_COLUMNS,
+                               e.g. the output of create_mega_df.
+        Returns:
+            DataFrame: The feature rows that were (re)computed.
+        """
+        inputs = _inputs(frame)
+        if inputs.empty:
+            return inputs
+
+        meta = self._meta(ticker)
+        states = self._states(ticker)
+        if not meta or not states or meta[2] != PARAMS or inputs["date"].iloc[0] < pd.Timestamp(meta[0]):
+            return self._rebuild(ticker, inputs)
+
+        changed = self._changed_from(inputs, states)
+        if changed is None:
+            return inputs.iloc[:0]
+        before = [(d, s) for d, s in states if d < changed]
+        if not before:
+            return self._rebuild(ticker, inputs)
+        resume, state = before[-1]
+
+        # Retained days after the resume point that this frame does not cover are recomputed too
+        retained = pd.DataFrame(
+            [{"date": d, **s["inputs"]} for d, s in states if d > resume], columns=["date", *INPUT_COLUMNS]
+        )
+        tail = _inputs(pd.concat([retained, inputs[inputs["date"] > resume]]))
+
+        months = sorted({resume.strftime("%Y-%m"), *tail["date"].dt.strftime("%Y-%m")})
+        existing = self._read(ticker, months if self.fmt == "parquet" else None)
+        if not (existing["date"] == resume).any():
+            # Feature rows went missing from the output store
+            return self._rebuild(ticker, inputs)
+
+        features, new_states = compute_features(tail, state)
+        print(f"🧮 {ticker}: {len(features)} feature day(s) updated from {resume:%Y-%m-%d}")
+        self._save(ticker, pd.concat([existing[existing["date"] <= resume], features]), features, new_states, resume)
+        return features
+
+    def _rebuild(self, ticker, inputs):
+        stored = self._read(ticker)
+        stored = stored[~stored["date"].isin(inputs["date"])]
+        features, states = compute_features(_inputs(pd.concat([stored, inputs])))
+        print(f"🧮 {ticker}: rebuilt {len(features)} feature day(s)")
+        self._save(ticker, features, features, states, None)
+        return features
+
+    def _save(self, ticker, rows, features, states, resume):
+        write_frame(rows, DATASET, ticker, fmt=self.fmt, base_dir=self.base_dir)
+        since = "" if resume is None else resume.strftime("%Y-%m-%d")
+        first_date = rows["date"].min().strftime("%Y-%m-%d")
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM feature_state WHERE ticker = ? AND date > ?", (ticker, since))
+            self._conn.executemany(
+                "INSERT INTO feature_state VALUES (?, ?, ?)",
+                [(ticker, d.strftime("%Y-%m-%d"), json.dumps(s)) for d, s in states],
+            )
+            self._conn.execute(
+                """
+                DELETE FROM feature_state WHERE ticker = ? AND date NOT IN (
+                    SELECT date FROM feature_state WHERE ticker = ? ORDER BY date DESC LIMIT ?
+                )
+                """,
+                (ticker, ticker, STATE_RETENTION_DAYS),
+            )
+            self._conn.execute(
+                """
+                INSERT INTO feature_tickers VALUES (?, ?, ?, ?)
+                ON CONFLICT (ticker) DO UPDATE SET
+                    first_date = MIN(first_date, excluded.first_date),
+                    last_date = excluded.last_date,
+                    params = excluded.params
+                """,
+                (ticker, first_date, features["date"].max().strftime("%Y-%m-%d"), PARAMS),
+            )
+
+    def matrix(self, tickers=None, start=None, end=None, as_of=None, columns=None, min_history=0):
+        """
+        Feature matrix for training or scoring.
+        Every feature on a row is computed from that day and earlier days
+        only, so the matrix as of a day matches what a run on that day
+        would have seen.
+        Args:
+            tickers (list): Tickers to include; all stored tickers if None.
+            start, end (str): Inclusive date range of rows to return.
+            as_of (str): Drop rows after this day.
+            columns (list): Feature columns; defaults to feature_columns().
+            min_history (int): Skip each ticker's first rows (warm-up) up to
+                               this many trading days.
+        Returns:
+            DataFrame: 'ticker', 'date' and the feature columns, sorted by
+                       (ticker, date).
+        """
+        columns = list(columns or feature_columns())
+        if tickers is None:
+            try:
+                df = read_frame(DATASET, fmt=self.fmt, base_dir=self.base_dir)
+            except (FileNotFoundError, OSError):
+                df = pd.DataFrame(columns=["ticker", "date", *feature_columns()])
+        else:
+            df = pd.concat([self._read(t).assign(ticker=t) for t in tickers], ignore_index=True)
+        df["date"] = pd.to_datetime(df["date"]).astype("datetime64[ns]")
+
+        keep = df["time"] > min_history
+        if start is not None:
+            keep &= df["date"] >= pd.Timestamp(start)
+        for last in (end, as_of):
+            if last is not None:
+                keep &= df["date"] <= pd.Timestamp(last)
+        df = df.loc[keep, ["ticker", "date", *columns]]
+        return df.sort_values(["ticker", "date"]).reset_index(drop=True)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
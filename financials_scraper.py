@@ -1,22 +1,76 @@
-import requests
+import os
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
+from http_client import FMP_BASE_URL, fmp_rate_limiter, get_json, get_response_cache, get_session
+
+# EOD history older than this many days is treated as final and cached forever
+TRAILING_DAYS = 5
+# Responses covering the trailing days are re-fetched after this many seconds
+TRAILING_TTL = 6 * 3600
+
+def _history_blocks(start, end, cutoff):
+    """
+    Split [start, end] into whole calendar months. Months that end on or
+    before `cutoff` can never change; the rest is one trailing block.
+    """
+    blocks = []
+    month_start = start.replace(day=1)
+    while month_start <= end:
+        month_end = month_start + relativedelta(months=1) - timedelta(days=1)
+        if month_end > cutoff:
+            blocks.append((month_start, end, False))
+            break
+        blocks.append((month_start, month_end, True))
+        month_start = month_end + timedelta(days=1)
+    return blocks
+
+def fetch_fmp_history(endpoint, ticker, start_date, end_date, api_key, cache=None):
+    """
+    Fetch a per-symbol FMP history endpoint through the on-disk response cache.
+    The range is requested in month blocks. Blocks entirely older than
+    TRAILING_DAYS are cached without expiry, so repeated runs only re-fetch
+    the trailing block, and only once its TTL has passed.
+    Returns:
+        list: Records with start_date <= date <= end_date, newest first.
+    """
+    cache = cache or get_response_cache()
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    cutoff = datetime.now() - timedelta(days=TRAILING_DAYS)
+
+    records = []
+    for block_start, block_end, final in _history_blocks(start, end, cutoff):
+        date_from, date_to = block_start.strftime("%Y-%m-%d"), block_end.strftime("%Y-%m-%d")
+        data = cache.get(endpoint, ticker, date_from, date_to)
+        if data is None:
+            data = get_json(
+                f"{FMP_BASE_URL}/stable/{endpoint}",
+                params={"symbol": ticker, "from": date_from, "to": date_to, "apikey": api_key},
+                session=get_session(),
+                limiter=fmp_rate_limiter(),
+            )
+            if not isinstance(data, list):
+                raise ValueError(f"❌ Unexpected response from {endpoint}: {str(data)[:200]}")
+            cache.put(endpoint, ticker, date_from, date_to, data, ttl=None if final else TRAILING_TTL)
+        records.extend(data)
+
+    records = [r for r in records if start_date <= r.get("date", "")[:10] <= end_date]
+    return sorted(records, key=lambda r: r["date"], reverse=True)
 
 def fetch_market_cap(ticker, start_date, end_date, api_key):
     print(f"📊 Fetching market capitalization data for {ticker} from {start_date} to {end_date}...")
-    url = f"https://financialmodelingprep.com/stable/historical-market-capitalization?symbol={ticker}&from={start_date}&to={end_date}&apikey={api_key}"
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
-    print(data)
-    df = pd.DataFrame(data)
+    data = fetch_fmp_history("historical-market-capitalization", ticker, start_date, end_date, api_key)
+    print(f"Received {len(data)} market cap rows")
+    df = pd.DataFrame(data, columns=["date", "marketCap"])
     df.rename(columns={"date": "date", "marketCap": "market_cap"}, inplace=True)
     df["date"] = pd.to_datetime(df["date"])
     df["market_cap"] = df["market_cap"].astype(float).astype(int)
     return df[["date", "market_cap"]]
 
 def fetch_eps_and_revenue(ticker, start_date, end_date, api_key):
+    import requests
+
     print(f"📈 Fetching EPS and Revenue data for {ticker}...")
     start = datetime.strptime(start_date, "%Y-%m-%d")
     end = datetime.strptime(end_date, "%Y-%m-%d")
@@ -62,14 +116,19 @@ def fetch_eps_and_revenue(ticker, start_date, end_date, api_key):
     print(df)
     return df
 
-def fetch_stock_price(ticker, start_date, end_date, api_key):
+def fetch_stock_price(ticker, start_date, end_date, api_key, allow_empty=False):
+    """
+    Args:
+        allow_empty (bool): Return an empty frame instead of raising when the
+                            range has no trading days (weekends, holidays,
+                            or today before the EOD bar is published).
+    """
     print(f"📊 Fetching stock price data for {ticker} from {start_date} to {end_date}...")
-    url = f"https://financialmodelingprep.com/stable/historical-price-eod/dividend-adjusted?symbol={ticker}&from={start_date}&to={end_date}&apikey={api_key}"
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
-    print(data)
-    if not isinstance(data, list) or not data:
+    data = fetch_fmp_history("historical-price-eod/dividend-adjusted", ticker, start_date, end_date, api_key)
+    print(f"Received {len(data)} price rows")
+    if not data:
+        if allow_empty:
+            return pd.DataFrame({"date": pd.to_datetime([]), "stock_price": [], "stock_return": []})
         raise ValueError("❌ Unexpected or empty response from stock price endpoint.")
 
     df = pd.DataFrame(data)
@@ -79,11 +138,11 @@ def fetch_stock_price(ticker, start_date, end_date, api_key):
     df["stock_return"] = df["stock_price"].pct_change()
     return df
 
-def fetch_financials_data(ticker, start_date, end_date, api_key):
+def fetch_financials_data(ticker, start_date, end_date, api_key, allow_empty=False):
     print(f"📈 Fetching financial data for {ticker}...")
 
     # Fetch all parts
-    price_df = fetch_stock_price(ticker, start_date, end_date, api_key)
+    price_df = fetch_stock_price(ticker, start_date, end_date, api_key, allow_empty=allow_empty)
     cap_df = fetch_market_cap(ticker, start_date, end_date, api_key)
     # earnings_df = fetch_eps_and_revenue(ticker, start_date, end_date, api_key)
 
@@ -100,10 +159,13 @@ def fetch_financials_data(ticker, start_date, end_date, api_key):
     return df
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
     ticker = "AAPL"
     start_date = "2025-04-05"
     end_date = "2025-05-15"
-    api_key = "q3C1tfT5hbzLrWsxBXHNkWqku3hYCHc6"  # Replace with your actual key
+    api_key = os.getenv("FMP_API_KEY")
 
     final_df = fetch_financials_data(ticker, start_date, end_date, api_key)
     print(final_df)
@@ -0,0 +1,197 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from instrumentation import incr
+
+FMP_BASE_URL = os.getenv("FMP_BASE_URL", "https://financialmodelingprep.com")
+# FMP Starter plan quota; override for other plans
+FMP_CALLS_PER_MINUTE = int(os.getenv("FMP_CALLS_PER_MINUTE", "300"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+DEFAULT_HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "data/http_cache.sqlite")
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+    acquire() blocks until a token is available; up to `capacity` calls can
+    burst, after which calls are spaced at `rate` per second.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RequestFailed(Exception):
+    """Raised when a request still fails after all retries."""
+
+
+_SESSION = None
+_FMP_LIMITER = None
+_LOCK = threading.Lock()
+
+
+def get_session(pool_size=32):
+    """Return the process-wide keep-alive session, creating it on first use."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    global _SESSION
+    with _LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _SESSION = session
+        return _SESSION
+
+
+def fmp_rate_limiter():
+    """Return the limiter shared by every FMP call in this process."""
+    global _FMP_LIMITER
+    with _LOCK:
+        if _FMP_LIMITER is None:
+            _FMP_LIMITER = TokenBucket(FMP_CALLS_PER_MINUTE / 60.0, capacity=10)
+        return _FMP_LIMITER
+
+
+def get_json(url, params=None, session=None, limiter=None, max_retries=4, backoff=0.5, timeout=30):
+    """
+    GET a URL and decode the JSON body, retrying 429/5xx and connection errors
+    with exponential backoff (honouring Retry-After when the server sends it).
+    Args:
+        url (str): Request URL.
+        params (dict): Query parameters.
+        session: requests.Session to use; defaults to the shared session.
+        limiter: TokenBucket to acquire before every attempt, or None.
+        max_retries (int): Retries after the first attempt.
+        backoff (float): Base delay in seconds, doubled on every retry.
+    Returns:
+        The decoded JSON payload.
+    Raises:
+        RequestFailed: If the request still fails after all retries.
+    """
+    import requests
+
+    session = session or get_session()
+    error = None
+
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            incr("http_requests_total", status="error")
+            # requests' message repeats the full URL, query string and API key included
+            error = type(e).__name__
+            response = None
+
+        if response is not None:
+            incr("http_requests_total", status=response.status_code)
+            incr("http_response_bytes_total", len(response.content))
+            if response.status_code not in RETRY_STATUSES:
+                if response.status_code >= 400:
+                    incr("http_failures_total")
+                    # Report the bare URL; the query string carries the API key
+                    raise RequestFailed(f"HTTP {response.status_code} for {url}")
+                return response.json()
+            error = f"HTTP {response.status_code}"
+
+        if attempt == max_retries:
+            break
+
+        incr("http_retries_total")
+
+        delay = backoff * (2 ** attempt) + random.uniform(0, backoff)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        time.sleep(delay)
+
+    incr("http_failures_total")
+    raise RequestFailed(f"{url} failed after {max_retries + 1} attempts: {error}")
+
+
+class ResponseCache:
+    """
+    On-disk cache of decoded JSON responses, keyed by (endpoint, symbol,
+    from, to). Entries stored with ttl=None never expire, which suits
+    historical data that can no longer change.
+    """
+
+    def __init__(self, path=DEFAULT_HTTP_CACHE_PATH):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                endpoint TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                date_from TEXT NOT NULL,
+                date_to TEXT NOT NULL,
+                expires_at REAL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (endpoint, symbol, date_from, date_to)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, endpoint, symbol, date_from, date_to):
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT payload, expires_at FROM responses
+                WHERE endpoint = ? AND symbol = ? AND date_from = ? AND date_to = ?
+                """,
+                (endpoint, symbol, date_from, date_to),
+            ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return json.loads(row[0])
+
+    def put(self, endpoint, symbol, date_from, date_to, payload, ttl=None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (endpoint, symbol, date_from, date_to, expires_at, json.dumps(payload)),
+            )
+
+
+_RESPONSE_CACHE = None
+
+
+def get_response_cache():
+    """Return the process-wide response cache, opening it on first use."""
+    global _RESPONSE_CACHE
+    with _LOCK:
+        if _RESPONSE_CACHE is None:
+            _RESPONSE_CACHE = ResponseCache()
+        return _RESPONSE_CACHE
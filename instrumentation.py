@@ -0,0 +1,275 @@
+import cProfile
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Write a Prometheus text-format snapshot here at the end of a run
+METRICS_FILE = os.getenv("METRICS_FILE")
+# Opt-in profiling of hot sections: "cprofile" or "sample"
+PROFILE = os.getenv("PROFILE", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Seconds between stack samples in "sample" mode
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+
+PREFIX = "stock_engine"
+
+# Held while a section is being profiled
+_PROFILING = threading.Lock()
+
+
+class Metrics:
+    """
+    Thread-safe, process-wide counters and summaries.
+    Counters only go up (requests, bytes, texts); summaries keep count, sum
+    and max of observed values (stage seconds, batch sizes). Both may carry
+    labels, e.g. incr("http_requests_total", status=200).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = Counter()
+            self.summaries = {}
+            self.started = time.time()
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+    def incr(self, name, value=1, **labels):
+        with self._lock:
+            self.counters[self._key(name, labels)] += value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            count, total, peak = self.summaries.get(key, (0, 0.0, value))
+            self.summaries[key] = (count + 1, total + value, max(peak, value))
+
+    @contextlib.contextmanager
+    def stage(self, name, **labels):
+        """Time the block as stage `name`, and profile it when PROFILE is set."""
+        started = time.perf_counter()
+        try:
+            with profile(name):
+                yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - started, stage=name, **labels)
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self.counters.get(self._key(name, labels), 0)
+
+    def total(self, name):
+        """Sum of a counter over all label values."""
+        with self._lock:
+            return sum(v for (n, _), v in self.counters.items() if n == name)
+
+
+METRICS = Metrics()
+
+incr = METRICS.incr
+observe = METRICS.observe
+stage = METRICS.stage
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def summary(metrics=METRICS):
+    """
+    Roll the raw metrics up into the numbers we look at after a run.
+    Returns:
+        dict: stage timings, HTTP totals, sentiment throughput, batch sizes,
+              cache hit rate and peak RSS.
+    """
+    with metrics._lock:
+        counters = dict(metrics.counters)
+        summaries = dict(metrics.summaries)
+
+    def labelled(name, label):
+        return {dict(labels)[label]: v for (n, labels), v in counters.items() if n == name}
+
+    stages = {
+        dict(labels)["stage"]: {"count": count, "seconds": round(total, 4), "max_seconds": round(peak, 4)}
+        for (name, labels), (count, total, peak) in summaries.items()
+        if name == "stage_seconds"
+    }
+    inference = sum(v[1] for (n, _), v in summaries.items() if n == "sentiment_inference_seconds")
+    texts = metrics.total("sentiment_texts_scored_total")
+    batches = summaries.get(Metrics._key("sentiment_batch_size", {}))
+    hits = metrics.total("sentiment_cache_hits_total")
+    misses = metrics.total("sentiment_cache_misses_total")
+
+    return {
+        "event": "run_metrics",
+        "wall_seconds": round(time.time() - metrics.started, 3),
+        "stages": stages,
+        "http": {
+            "requests": metrics.total("http_requests_total"),
+            "by_status": labelled("http_requests_total", "status"),
+            "bytes": metrics.total("http_response_bytes_total"),
+            "retries": metrics.total("http_retries_total"),
+            "failures": metrics.total("http_failures_total"),
+        },
+        "sentiment": {
+            "texts_scored": texts,
+            "texts_per_second": round(texts / inference, 2) if inference else None,
+            "batches": batches[0] if batches else 0,
+            "mean_batch_size": round(batches[1] / batches[0], 2) if batches else None,
+            "max_batch_size": batches[2] if batches else None,
+            "cache_hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+        },
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def log_summary(metrics=METRICS):
+    """Print the run summary as one JSON line and return it."""
+    report = summary(metrics)
+    print(json.dumps(report, default=str))
+    return report
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def write_prometheus(path=None, metrics=METRICS):
+    """
+    Write every metric in Prometheus text format, e.g. for node_exporter's
+    textfile collector. The file is replaced atomically.
+    Returns:
+        str: The path written, or None if no path was given or configured.
+    """
+    path = path or METRICS_FILE
+    if not path:
+        return None
+
+    with metrics._lock:
+        counters = sorted(metrics.counters.items())
+        summaries = sorted(metrics.summaries.items())
+
+    lines = []
+    typed = set()
+
+    def family(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+    for (name, labels), value in counters:
+        family(name, "counter")
+        lines.append(f"{PREFIX}_{name}{_labels(labels)} {value}")
+    for (name, labels), (count, total, peak) in summaries:
+        family(name, "summary")
+        lines.append(f"{PREFIX}_{name}_count{_labels(labels)} {count}")
+        lines.append(f"{PREFIX}_{name}_sum{_labels(labels)} {total}")
+    for (name, labels), (count, total, peak) in summaries:
+        family(f"{name}_max", "gauge")
+        lines.append(f"{PREFIX}_{name}_max{_labels(labels)} {peak}")
+    rss = peak_rss_bytes()
+    if rss is not None:
+        lines.append(f"# TYPE {PREFIX}_peak_rss_bytes gauge")
+        lines.append(f"{PREFIX}_peak_rss_bytes {rss}")
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+class StackSampler:
+    """
+    Sample one thread's Python stack every `interval` seconds and count
+    collapsed stacks, in the same "frame;frame;frame count" format that
+    py-spy's raw output, flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextlib.contextmanager
+def profile(name, mode=None):
+    """
+    Profile the block when PROFILE (or `mode`) is "cprofile" or "sample".
+    cprofile writes a pstats file (snakeviz, pstats); sample writes collapsed
+    stacks (speedscope, flamegraph.pl). Files go to PROFILE_DIR as
+    <name>-<pid>-<time>.prof / .collapsed. One section is profiled at a
+    time, so sections nested in (or running alongside) a profiled one are
+    skipped. Any other value is a no-op, which keeps the hook safe to leave
+    in hot paths; py-spy can still attach externally.
+    """
+    mode = mode or PROFILE
+    if mode not in ("cprofile", "sample") or not _PROFILING.acquire(blocking=False):
+        yield
+        return
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{name}-{os.getpid()}-{int(time.time())}")
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = StackSampler(threading.get_ident())
+        profiler.start()
+    try:
+        yield
+    finally:
+        _PROFILING.release()
+        if mode == "cprofile":
+            profiler.disable()
+            profiler.dump_stats(path + ".prof")
+        else:
+            profiler.stop()
+            profiler.write(path + ".collapsed")
+        print(f"🔬 Profile for {name} saved to {path}")
+
@@ -0,0 +1,136 @@
+import pandas as pd
+
+from sentiment.aggregation import stats_columns, totals_from_stats
+
+# How many calendar days weekend/holiday sentiment may roll onto a trading day
+MAX_ROLL_DAYS = 4
+ROLL_MODES = ("forward", "backward", "none")
+
+# Daily stats columns per source, as produced by the scrapers' calculate_daily_stats
+SENTIMENT_SOURCES = {
+    "news": {"count_column": "num_articles", "sentiment_column": "news_sentiment"},
+    "reddit": {"count_column": "reddit_post_volume", "sentiment_column": "reddit_sentiment"},
+}
+
+# Stand-in key for single-ticker frames without a ticker column
+_SINGLE = "__ticker__"
+
+
+def _with_dates(df, by):
+    """Copy with 'date' as normalized datetime64 and a `by` column, coerced once."""
+    df = df.copy()
+    df["date"] = pd.to_datetime(df["date"]).dt.normalize().astype("datetime64[ns]")
+    df[by] = df[by].astype(str) if by in df.columns else _SINGLE
+    return df
+
+
+def align_to_trading_days(stats, trading_days, prefix, roll="forward", max_roll_days=MAX_ROLL_DAYS, by="ticker"):
+    """
+    Re-bucket one source's daily sentiment stats onto trading days.
+    Each calendar day is matched with merge_asof to the next (roll="forward")
+    or previous ("backward") trading day of the same ticker within
+    max_roll_days, or only to itself ("none"). Days that land on the same
+    trading day are combined from their sums, so counts add up and means,
+    stds and label shares stay exact.
+    Args:
+        stats (DataFrame): Daily stats with 'date' and `by` columns.
+        trading_days (DataFrame): 'date' and `by` columns of valid trading days.
+        prefix (str): Source name, a key of SENTIMENT_SOURCES.
+    Returns:
+        DataFrame: `by`, 'date' (trading day) and the same stats columns.
+                   Days with no trading day in range are dropped.
+    """
+    if roll not in ROLL_MODES:
+        raise ValueError(f"Unknown roll mode '{roll}', expected one of {ROLL_MODES}")
+    count_column = SENTIMENT_SOURCES[prefix]["count_column"]
+
+    calendar = trading_days[[by, "date"]].drop_duplicates().rename(columns={"date": "trade_date"})
+    matched = pd.merge_asof(
+        stats.sort_values("date"),
+        calendar.sort_values("trade_date"),
+        left_on="date",
+        right_on="trade_date",
+        by=by,
+        direction="backward" if roll == "backward" else "forward",
+        tolerance=pd.Timedelta(days=0 if roll == "none" else max_roll_days),
+    )
+
+    unmatched = matched["trade_date"].isna()
+    if unmatched.any():
+        print(f"⚠️ {prefix}: {int(matched.loc[unmatched, count_column].sum())} item(s) on "
+              f"{int(unmatched.sum())} day(s) have no trading day within {max_roll_days} days")
+        matched = matched[~unmatched]
+
+    totals = totals_from_stats(matched, count_column, prefix)
+    totals[by] = matched[by].to_numpy()
+    totals["date"] = matched["trade_date"].to_numpy()
+    totals = totals.groupby([by, "date"], sort=True).sum()
+    return pd.DataFrame(stats_columns(totals, count_column, prefix), index=totals.index).reset_index()
+
+
+def add_lags(df, columns, lags=(1,), by="ticker"):
+    """
+    Add `<column>_lag<k>` columns holding each column k rows (trading days)
+    earlier within the same ticker. `df` must be sorted by (by, date).
+    """
+    grouped = df.groupby(by, sort=False)[columns]
+    for lag in lags:
+        shifted = grouped.shift(lag)
+        for column in columns:
+            df[f"{column}_lag{lag}"] = shifted[column]
+    return df
+
+
+def join_sentiment(financials, news=None, reddit=None, roll="forward", max_roll_days=MAX_ROLL_DAYS, lags=(1,),
+                   fill_missing=True, trading_days=None, by="ticker"):
+    """
+    Join daily news/Reddit stats onto the trading-day price frame.
+    Sentiment from weekends and holidays rolls onto the next trading day (see
+    align_to_trading_days) instead of producing price-less rows, then lagged
+    sentiment and volume columns are added. Every step is a vectorized
+    merge/groupby, and frames may hold many tickers in a `by` column.
+    Args:
+        financials (DataFrame): One row per ticker and trading day.
+        news, reddit (DataFrame): Daily stats from calculate_daily_stats, or None.
+        roll (str): "forward", "backward" or "none".
+        max_roll_days (int): Furthest a day may roll, in calendar days.
+        lags (tuple): Trading-day lags to add for sentiment and volume.
+        fill_missing (bool): Zero the stats on trading days without any
+                             items; otherwise leave them NaN (counts are
+                             always zero).
+        trading_days (DataFrame): Optional exchange calendar ('date' and
+                                  `by`); defaults to the days in `financials`.
+    Returns:
+        DataFrame: One row per ticker and trading day, sorted by (by, date),
+                   with 'news_sentiment' / 'reddit_sentiment' naming the
+                   average signed sentiment.
+    """
+    single = by not in financials.columns
+    spine = _with_dates(financials, by).sort_values([by, "date"]).reset_index(drop=True)
+    calendar = spine if trading_days is None else _with_dates(trading_days, by)
+
+    sentiment_columns = []
+    lag_columns = []
+    for prefix, stats in (("news", news), ("reddit", reddit)):
+        if stats is None:
+            continue
+        source = SENTIMENT_SOURCES[prefix]
+        aligned = align_to_trading_days(_with_dates(stats, by), calendar, prefix, roll, max_roll_days, by)
+        aligned = aligned.rename(columns={"average_signed_sentiment": source["sentiment_column"]})
+        columns = [c for c in aligned.columns if c not in (by, "date")]
+        spine = spine.merge(aligned, on=[by, "date"], how="left")
+
+        spine[source["count_column"]] = spine[source["count_column"]].fillna(0).astype(int)
+        if fill_missing:
+            spine[columns] = spine[columns].fillna(0.0)
+        sentiment_columns += columns
+        lag_columns += [source["sentiment_column"], source["count_column"]]
+
+    if lags and lag_columns:
+        spine = add_lags(spine, lag_columns, lags, by)
+
+    # Keep the old layout: date, sentiment stats, then financials and lags
+    financial_columns = [c for c in financials.columns if c not in (by, "date")]
+    lagged = [c for c in spine.columns if c not in sentiment_columns + financial_columns + [by, "date"]]
+    spine = spine[[by, "date"] + sentiment_columns + financial_columns + lagged]
+    return spine.drop(columns=[by]) if single else spine
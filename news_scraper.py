@@ -1,108 +1,211 @@
-import requests
+import os
 import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from tqdm import tqdm
-import time
-from sentiment.finbert import analyze_sentiment
+from http_client import FMP_BASE_URL, fmp_rate_limiter, get_json, get_session
+from instrumentation import incr
+from sentiment.aggregation import daily_sentiment_stats
+from sentiment.finbert import analyze_sentiment_batch, get_finbert_model
+from sentiment.preprocess import prepare_texts
+
+def _parse_articles(data):
+    # Extract relevant fields from each article
+    return [
+        {
+            "symbol": article.get("symbol"),
+            "publishedDate": article.get("publishedDate"),
+            "publisher": article.get("publisher"),
+            "title": article.get("title"),
+            "image": article.get("image"),
+            "site": article.get("site"),
+            "text": article.get("text"),
+            "url": article.get("url"),
+        }
+        for article in data
+    ]
+
+def _plan_windows(start, end, window_days):
+    windows = []
+    while start <= end:
+        window_end = min(start + timedelta(days=window_days - 1), end)
+        windows.append((start, window_end))
+        start = window_end + timedelta(days=1)
+    return windows
+
+def fetch_news_window(symbol, window_start, window_end, api_key, limit, failed_windows, truncated_days):
+    """
+    Fetch one date window of FMP news, bisecting it while responses come back
+    full. Failures and still-truncated single days are appended to the given
+    lists.
+    Returns:
+        list: Parsed articles for the window.
+    """
+    params = {
+        "apikey": api_key,
+        "symbols": symbol,
+        "from": window_start.strftime("%Y-%m-%d"),
+        "to": window_end.strftime("%Y-%m-%d"),
+        "limit": limit,
+    }
+    try:
+        data = get_json(f"{FMP_BASE_URL}/stable/news/stock", params=params, session=get_session(), limiter=fmp_rate_limiter())
+        # FMP reports errors such as "Limit Reach" as a 200 with an object
+        if not isinstance(data, list):
+            raise ValueError(f"Unexpected response: {str(data)[:200]}")
+    except Exception as e:
+        failed_windows.append({"from": params["from"], "to": params["to"], "error": str(e)})
+        return []
+
+    if len(data) < limit:
+        return _parse_articles(data)
+    if window_start == window_end:
+        truncated_days.append(params["from"])
+        return _parse_articles(data)
+
+    # Window overflowed: split it in half and fetch both sides
+    mid = window_start + timedelta(days=(window_end - window_start).days // 2)
+    return (
+        fetch_news_window(symbol, window_start, mid, api_key, limit, failed_windows, truncated_days)
+        + fetch_news_window(symbol, mid + timedelta(days=1), window_end, api_key, limit, failed_windows, truncated_days)
+    )
 
-def fetch_fmp_news_daily(symbol="AAPL", start_date="2025-05-10", end_date="2025-06-10", api_key="YOUR_API_KEY", limit_per_day=150):
+def fetch_fmp_news(symbol="AAPL", start_date="2025-05-10", end_date="2025-06-10", api_key="YOUR_API_KEY", limit=150, window_days=7, max_workers=8):
+    """
+    Fetch FMP stock news with adaptive date windows.
+    Each request first covers `window_days` days. When a response comes back
+    full (len == limit) the window is bisected and both halves re-requested,
+    so quiet stretches cost one call and busy days are not truncated.
+    Windows are fetched concurrently over a pooled keep-alive session within
+    the shared FMP rate limit, and articles are de-duplicated by URL.
+    Returns:
+        tuple: (DataFrame of articles sorted by publishedDate,
+                list of {"from", "to", "error"} dicts for windows that failed)
+        Single days that still hit the limit are listed in
+        df.attrs["truncated_days"].
+    """
     start = datetime.strptime(start_date, "%Y-%m-%d")
     end = datetime.strptime(end_date, "%Y-%m-%d")
 
+    failed_windows = []
+    truncated_days = []
+
+    windows = _plan_windows(start, end, window_days)
     all_articles = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(fetch_news_window, symbol, a, b, api_key, limit, failed_windows, truncated_days)
+            for a, b in windows
+        ]
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            all_articles.extend(future.result())
 
-    for i in tqdm(range((end - start).days + 1)):
-        day = start + timedelta(days=i)
-        day_str = day.strftime("%Y-%m-%d")
-
-        url = (
-            f"https://financialmodelingprep.com/stable/news/stock?apikey={api_key}"
-            f"&symbols={symbol}&from={day_str}&to={day_str}&limit={limit_per_day}"
-        )
-
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
-
-            # Extract relevant fields from each article
-            for article in data:
-                all_articles.append({
-                    "symbol": article.get("symbol"),
-                    "publishedDate": article.get("publishedDate"),
-                    "publisher": article.get("publisher"),
-                    "title": article.get("title"),
-                    "image": article.get("image"),
-                    "site": article.get("site"),
-                    "text": article.get("text"),
-                    "url": article.get("url"),
-                })
-
-        except Exception as e:
-            print(f"❌ Failed on {day_str}: {e}")
-
-        # optional: prevent hammering the API
-        time.sleep(0.3)  # adjust this if you hit rate limits
-
-    # Create a DataFrame from the collected articles
     df = pd.DataFrame(all_articles)
+    if not df.empty:
+        # Syndicated articles can straddle window edges; articles without a
+        # URL can't be matched, so they are all kept
+        df = df[df["url"].isna() | ~df.duplicated(subset="url", keep="first")]
+        df = df.sort_values("publishedDate", kind="stable").reset_index(drop=True)
+
+    failed_windows.sort(key=lambda f: f["from"])
+    df.attrs["truncated_days"] = sorted(truncated_days)
+    incr("news_articles_fetched_total", len(df))
+    incr("news_failed_windows_total", len(failed_windows))
+    return df, failed_windows
+
+def iter_fmp_news(symbol="AAPL", start_date="2025-05-10", end_date="2025-06-10", api_key="YOUR_API_KEY", limit=150, window_days=7, max_workers=4):
+    """
+    Stream FMP news window by window, in date order.
+    At most `max_workers` windows are in flight at a time, so memory stays
+    bounded however long the range is.
+    Yields:
+        tuple: (DataFrame of the window's articles, list of "YYYY-MM-DD"
+                days the window covers, list of failed window dicts)
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    windows = _plan_windows(start, end, window_days)
+    previous_urls = set()
+
+    def fetch(window):
+        failed_windows = []
+        articles = fetch_news_window(symbol, window[0], window[1], api_key, limit, failed_windows, [])
+        return articles, failed_windows
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque(executor.submit(fetch, w) for w in windows[:max_workers])
+        for i, window in enumerate(windows):
+            articles, failed_windows = pending.popleft().result()
+            if i + max_workers < len(windows):
+                pending.append(executor.submit(fetch, windows[i + max_workers]))
+
+            # Syndicated articles can straddle window edges, so only the
+            # previous window's URLs need remembering
+            articles = [a for a in articles if a["url"] is None or a["url"] not in previous_urls]
+            previous_urls = {a["url"] for a in articles if a["url"] is not None}
+            days = [(window[0] + timedelta(days=d)).strftime("%Y-%m-%d") for d in range((window[1] - window[0]).days + 1)]
+            incr("news_articles_fetched_total", len(articles))
+            incr("news_failed_windows_total", len(failed_windows))
+            yield pd.DataFrame(articles), days, failed_windows
+
+def fetch_fmp_news_daily(symbol="AAPL", start_date="2025-05-10", end_date="2025-06-10", api_key="YOUR_API_KEY", limit_per_day=150, window_days=7, max_workers=8):
+    # limit_per_day is the per-request limit; windows shrink until under it
+    df, failed_windows = fetch_fmp_news(symbol, start_date, end_date, api_key, limit_per_day, window_days, max_workers)
+
+    if failed_windows:
+        print(f"❌ {len(failed_windows)} window(s) failed: {', '.join(f['from'] + '..' + f['to'] for f in failed_windows)}")
+    if df.attrs["truncated_days"]:
+        print(f"⚠️ Hit the per-request limit on: {', '.join(df.attrs['truncated_days'])}")
+
+    # Keep the structured failure list with the frame for callers that want it
+    df.attrs["failed_windows"] = failed_windows
     return df
 
-def sentiment_news(df):
+def sentiment_news(df, classifier=None, score_fn=None):
     print("📰 Analyzing News Sentiment...")
 
     if 'text' not in df.columns:
         print("Error: 'text' column not found in the DataFrame.")
         return
 
-    sentiment_scores = []
-    sentiment_labels = []
-    for text in df['text']:
-        if pd.isna(text):
-            sentiment_scores.append(None)
-            sentiment_labels.append(None)
-            continue
-
-        try:
-            sentiment = analyze_sentiment(text)
-            sentiment_scores.append(sentiment['score'])
-            sentiment_labels.append(sentiment['label'])
-        except Exception as e:
-            print(f"❌ Error analyzing sentiment: {e}")
-            sentiment_scores.append(None)
-            sentiment_labels.append(None)
+    # Reuse one model handle for every article, unless score_fn sends the
+    # texts elsewhere (e.g. to a worker pool). Errors from a caller's score_fn
+    # propagate, so a broken pool fails the ticker instead of storing None
+    external = score_fn is not None
+    if score_fn is None:
+        if classifier is None:
+            classifier = get_finbert_model()
+        score_fn = lambda texts: analyze_sentiment_batch(texts, classifier=classifier)
+
+    # Score each distinct text once: syndicated copies and cross-posts collapse
+    # to one canonical text and get its score fanned back out
+    prepared = prepare_texts(df['text'].tolist())
+    print(f"🧹 {len(df)} articles -> {len(prepared.canonical)} unique texts")
+
+    try:
+        results = prepared.expand(score_fn(prepared.canonical))
+    except Exception as e:
+        if external:
+            raise
+        print(f"❌ Error analyzing sentiment: {e}")
+        results = [None] * len(df)
+
+    sentiment_scores = [r['score'] if r else None for r in results]
+    sentiment_labels = [r['label'] if r else None for r in results]
+    sentiment_tiers = [r.get('tier', 'finbert') if r else None for r in results]
 
     df['sentiment_score'] = sentiment_scores
     df['sentiment_label'] = sentiment_labels
+    df['sentiment_tier'] = sentiment_tiers
     return df
 
 def calculate_daily_stats(df):
     print("📊 Calculating daily statistics...")
 
-    # Convert publishedDate to datetime and drop rows with missing sentiment
-    df['publishedDate'] = pd.to_datetime(df['publishedDate'])
-    df = df.dropna(subset=['sentiment_score', 'sentiment_label'])
-
-    # Map label to signed score
-    def signed_score(row):
-        if row['sentiment_label'] == 'positive':
-            return row['sentiment_score']
-        elif row['sentiment_label'] == 'negative':
-            return -row['sentiment_score']
-        else:
-            return 0
-
-    df['signed_sentiment'] = df.apply(signed_score, axis=1)
-
-    # Group by day: mean sentiment and article volume
-    daily_stats = (
-        df.groupby(df['publishedDate'].dt.date)['signed_sentiment']
-        .agg(['mean', 'count'])
-        .reset_index()
-    )
-
-    # Rename columns
-    daily_stats.columns = ['date', 'average_signed_sentiment', 'num_articles']
+    # Signed sentiment mean, article volume, std and label mix per day, in one
+    # vectorized pass (rows with missing sentiment are ignored)
+    daily_stats = daily_sentiment_stats(df, 'publishedDate', 'num_articles', prefix='news')
 
     print(daily_stats.to_string(index=False))
 
@@ -110,11 +213,14 @@ def calculate_daily_stats(df):
 
 # ▶️ Run the function
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
     news_df = fetch_fmp_news_daily(
         symbol="AAPL",
         start_date="2025-05-08",
         end_date="2025-05-12",
-        api_key="q3C1tfT5hbzLrWsxBXHNkWqku3hYCHc6",  # replace with your real key
+        api_key=os.getenv("FMP_API_KEY"),
         limit_per_day=20
     )
 
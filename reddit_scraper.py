@@ -1,10 +1,15 @@
-import praw
 import pandas as pd
+import calendar
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+from instrumentation import incr
 from datetime import datetime, timedelta
-from sentiment.finbert import analyze_sentiment
+from sentiment.aggregation import daily_sentiment_stats
+from sentiment.finbert import analyze_sentiment_batch, get_finbert_model
+from sentiment.preprocess import prepare_texts
+from sentiment.tiered import tiered_score_fn
 
 # ✅ Load Reddit API credentials from .env file
 load_dotenv()
@@ -12,7 +17,154 @@ REDDIT_CLIENT_ID = os.getenv("REDDIT_CLIENT_ID")
 REDDIT_CLIENT_SECRET = os.getenv("REDDIT_CLIENT_SECRET")
 REDDIT_USER_AGENT = os.getenv("REDDIT_USER_AGENT")
 
-def fetch_daily_reddit_posts(client_id, client_secret, user_agent, keyword, subreddits, start_date, end_date):
+def _post_record(post, sub):
+    return {
+        'date': datetime.utcfromtimestamp(post.created_utc).date(),
+        'author': post.author.name if post.author else "N/A",
+        'title': post.title,
+        'text': post.selftext,
+        'url': post.url,
+        'score': post.score,
+        'num_comments': post.num_comments,
+        'subreddit': sub,
+        'source': 'Reddit'
+    }
+
+def fetch_subreddit_posts(reddit, sub, keyword, start_ts, end_ts):
+    """
+    Page through one subreddit's search results newest-first, keeping posts in
+    [start_ts, end_ts) and stopping as soon as posts are older than start_ts.
+    """
+    print(f"🔍 Fetching r/{sub} posts for '{keyword}'")
+    posts = []
+    for post in reddit.subreddit(sub).search(keyword, sort='new', time_filter='all', limit=None):
+        created = int(post.created_utc)
+        if created < start_ts:
+            break
+        if created < end_ts:
+            posts.append(_post_record(post, sub))
+    return posts
+
+def fetch_reddit_posts(client_id, client_secret, user_agent, keyword, subreddits, start_date, end_date, per_day_cap=5, max_workers=4):
+    """
+    Fetch posts for a date range with one search pass per subreddit instead of
+    one search per subreddit per day. Subreddits are fetched concurrently,
+    each on its own PRAW client (PRAW instances are not thread-safe and each
+    one paces itself from Reddit's rate-limit headers).
+    Args:
+        start_date, end_date (datetime): Inclusive range of UTC days.
+        per_day_cap (int): Keep at most this many newest posts per subreddit
+                           per day; None keeps everything.
+    Returns:
+        DataFrame: One row per post, bucketed by UTC day in 'date'.
+                   Subreddits that errored are listed in df.attrs["failed_subreddits"].
+    """
+    start_ts = calendar.timegm(start_date.date().timetuple())
+    end_ts = calendar.timegm((end_date.date() + timedelta(days=1)).timetuple())
+
+    import praw
+
+    def fetch_one(sub):
+        reddit = praw.Reddit(client_id=client_id, client_secret=client_secret, user_agent=user_agent)
+        return fetch_subreddit_posts(reddit, sub, keyword, start_ts, end_ts)
+
+    all_posts = []
+    failed_subreddits = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_one, sub): sub for sub in subreddits}
+        for future in as_completed(futures):
+            try:
+                all_posts.extend(future.result())
+            except Exception as e:
+                print(f"❌ Error fetching from r/{futures[future]}: {e}")
+                failed_subreddits.append(futures[future])
+
+    incr("reddit_posts_fetched_total", len(all_posts))
+    incr("reddit_failed_subreddits_total", len(failed_subreddits))
+
+    df = pd.DataFrame(all_posts)
+    df.attrs["failed_subreddits"] = sorted(failed_subreddits)
+    if df.empty:
+        return df
+
+    # Search results come newest-first, so head() keeps the same posts the
+    # per-day mode would have kept
+    if per_day_cap is not None:
+        df = df.groupby(['date', 'subreddit'], sort=False).head(per_day_cap)
+    df = df.sort_values('date', kind='stable').reset_index(drop=True)
+    df.attrs["failed_subreddits"] = sorted(failed_subreddits)
+    return df
+
+def iter_reddit_posts(client_id, client_secret, user_agent, keyword, subreddits, start_date, end_date, per_day_cap=5, page_size=100, reddit=None):
+    """
+    Stream posts for a date range, one page per subreddit in round-robin.
+    Each subreddit's search is newest-first, so once every subreddit has
+    moved past the start of a day, that day can receive no more posts.
+    Yields:
+        tuple: (DataFrame page of posts, list of "YYYY-MM-DD" days that are
+                now complete)
+    """
+    start_ts = calendar.timegm(start_date.date().timetuple())
+    end_ts = calendar.timegm((end_date.date() + timedelta(days=1)).timetuple())
+    if reddit is None:
+        import praw
+
+        reddit = praw.Reddit(client_id=client_id, client_secret=client_secret, user_agent=user_agent)
+
+    cursors = {sub: iter(reddit.subreddit(sub).search(keyword, sort='new', time_filter='all', limit=None)) for sub in subreddits}
+    # Oldest created_utc seen per subreddit. Later posts can only be as old
+    # or older, so every day starting after max(low_water) is complete
+    low_water = {sub: end_ts for sub in subreddits}
+    per_day_counts = {}
+    completed_from = end_ts
+
+    while cursors:
+        for sub in list(cursors):
+            page = []
+            for _ in range(page_size):
+                try:
+                    post = next(cursors[sub])
+                except StopIteration:
+                    post = None
+                except Exception as e:
+                    print(f"❌ Error fetching from r/{sub}: {e}")
+                    incr("reddit_failed_subreddits_total")
+                    post = None
+                if post is None or int(post.created_utc) < start_ts:
+                    del cursors[sub]
+                    low_water[sub] = start_ts - 1
+                    break
+
+                created = int(post.created_utc)
+                low_water[sub] = created
+                if created >= end_ts:
+                    continue
+                record = _post_record(post, sub)
+                key = (record['date'], sub)
+                if per_day_cap is not None and per_day_counts.get(key, 0) >= per_day_cap:
+                    continue
+                per_day_counts[key] = per_day_counts.get(key, 0) + 1
+                page.append(record)
+
+            boundary = max(low_water.values())
+            first_complete = boundary - boundary % 86400 + 86400
+            newly_completed = [
+                datetime.utcfromtimestamp(ts).strftime('%Y-%m-%d')
+                for ts in range(first_complete, completed_from, 86400)
+            ]
+            completed_from = min(completed_from, first_complete)
+            incr("reddit_posts_fetched_total", len(page))
+            if page or newly_completed:
+                yield pd.DataFrame(page), newly_completed
+
+def fetch_daily_reddit_posts(client_id, client_secret, user_agent, keyword, subreddits, start_date, end_date, mode="single_pass", per_day_cap=5):
+    # "single_pass" searches each subreddit once; "per_day" is the original
+    # one-search-per-day loop, kept for comparison
+    if mode == "single_pass":
+        return fetch_reddit_posts(client_id, client_secret, user_agent, keyword, subreddits, start_date, end_date, per_day_cap)
+
+    import praw
+
     reddit = praw.Reddit(
         client_id=client_id,
         client_secret=client_secret,
@@ -36,18 +188,8 @@ def fetch_daily_reddit_posts(client_id, client_secret, user_agent, keyword, subr
 
                 count = 0
                 for post in posts:
-                    if after <= int(post.created_utc) < before and count < 5:
-                        all_posts.append({
-                            'date': datetime.utcfromtimestamp(post.created_utc).date(),
-                            'author': post.author.name if post.author else "N/A",
-                            'title': post.title,
-                            'text': post.selftext,
-                            'url': post.url,
-                            'score': post.score,
-                            'num_comments': post.num_comments,
-                            'subreddit': sub,
-                            'source': 'Reddit'
-                        })
+                    if after <= int(post.created_utc) < before and (per_day_cap is None or count < per_day_cap):
+                        all_posts.append(_post_record(post, sub))
                         count += 1
 
                 time.sleep(1.5)  # polite delay
@@ -59,63 +201,61 @@ def fetch_daily_reddit_posts(client_id, client_secret, user_agent, keyword, subr
     df = pd.DataFrame(all_posts)
     return df
 
-def sentiment_reddit(df):
+def reddit_texts(df):
+    """Title and body joined per post; empty when both are missing."""
+    return (df['title'].fillna('').astype(str) + ' ' + df['text'].fillna('').astype(str)).str.strip()
+
+def sentiment_reddit(df, classifier=None, score_fn=None, tiered=False):
+    """
+    Score Reddit posts. With tiered=True, VADER scores clear-cut posts and
+    only ambiguous or finance-heavy ones reach FinBERT (see sentiment.tiered);
+    the 'sentiment_tier' column records which model produced each score.
+    """
     print("📘 Analyzing Reddit posts...")
 
     if 'text' not in df.columns or 'title' not in df.columns:
         print("Error: Required columns 'text' or 'title' not found in Reddit data.")
         return
 
-    sentiment_scores = []
-    sentiment_labels = []
-    for _, row in df.iterrows():
-        combined_text = f"{row['title']} {row['text']}"
-
-        if pd.isna(combined_text.strip()):
-            sentiment_scores.append(None)
-            sentiment_labels.append(None)
-            continue
-
-        try:
-            sentiment = analyze_sentiment(combined_text)
-            sentiment_scores.append(sentiment['score'])
-            sentiment_labels.append(sentiment['label'])
-        except Exception as e:
-            print(f"❌ Error analyzing Reddit sentiment: {e}")
-            sentiment_scores.append(None)
-            sentiment_labels.append(None)
+    # Reuse one model handle for every post, unless score_fn sends the
+    # texts elsewhere (e.g. to a worker pool). Errors from a caller's score_fn
+    # propagate, so a broken pool fails the ticker instead of storing None
+    external = score_fn is not None
+    if score_fn is None:
+        if classifier is None:
+            classifier = get_finbert_model()
+        score_fn = lambda texts: analyze_sentiment_batch(texts, classifier=classifier)
+    if tiered:
+        score_fn = tiered_score_fn(score_fn)
+
+    # Score each distinct text once: syndicated copies and cross-posts collapse
+    # to one canonical text and get its score fanned back out
+    prepared = prepare_texts(reddit_texts(df).tolist())
+    print(f"🧹 {len(df)} posts -> {len(prepared.canonical)} unique texts")
+
+    try:
+        results = prepared.expand(score_fn(prepared.canonical))
+    except Exception as e:
+        if external:
+            raise
+        print(f"❌ Error analyzing Reddit sentiment: {e}")
+        results = [None] * len(df)
+
+    sentiment_scores = [r['score'] if r else None for r in results]
+    sentiment_labels = [r['label'] if r else None for r in results]
+    sentiment_tiers = [r.get('tier', 'finbert') if r else None for r in results]
 
     df['sentiment_score'] = sentiment_scores
     df['sentiment_label'] = sentiment_labels
+    df['sentiment_tier'] = sentiment_tiers
     return df
 
 def calculate_daily_stats(df):
     print("📊 Calculating daily statistics...")
 
-    # Convert date to datetime and drop rows with missing sentiment
-    df['date'] = pd.to_datetime(df['date'])
-    df = df.dropna(subset=['sentiment_score', 'sentiment_label'])
-
-    # Map label to signed score
-    def signed_score(row):
-        if row['sentiment_label'] == 'positive':
-            return row['sentiment_score']
-        elif row['sentiment_label'] == 'negative':
-            return -row['sentiment_score']
-        else:
-            return 0
-
-    df['signed_sentiment'] = df.apply(signed_score, axis=1)
-
-    # Group by day: mean sentiment and post volume
-    daily_stats = (
-        df.groupby(df['date'].dt.date)['signed_sentiment']
-        .agg(['mean', 'count'])
-        .reset_index()
-    )
-
-    # Rename columns
-    daily_stats.columns = ['date', 'average_signed_sentiment', 'reddit_post_volume']
+    # Signed sentiment mean, post volume, std and label mix per day, in one
+    # vectorized pass (rows with missing sentiment are ignored)
+    daily_stats = daily_sentiment_stats(df, 'date', 'reddit_post_volume', prefix='reddit')
 
     print(daily_stats.to_string(index=False))
 
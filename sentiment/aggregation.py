@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+LABELS = ["positive", "negative", "neutral"]
+# Sign applied to the score for each label, in LABELS order; unknown labels count as 0
+_SIGNS = np.array([1.0, -1.0, 0.0, 0.0])
+
+_PARTIALS = ["n", "sum", "sum_sq", "positive", "negative", "neutral"]
+
+
+def _partials(df, date_column):
+    """Per-day sums for one frame (or chunk): count, sum, sum of squares, label counts."""
+    valid = df["sentiment_score"].notna().to_numpy() & df["sentiment_label"].notna().to_numpy()
+    labels = df["sentiment_label"].to_numpy()[valid]
+    scores = df["sentiment_score"].to_numpy()[valid]
+    days = pd.to_datetime(df[date_column].to_numpy()[valid]).normalize()
+
+    codes = pd.Categorical(labels, categories=LABELS).codes
+    signed = _SIGNS[codes] * scores.astype(float)
+    parts = pd.DataFrame(
+        {
+            "n": np.ones(len(signed)),
+            "sum": signed,
+            "sum_sq": signed * signed,
+            "positive": (codes == 0).astype(float),
+            "negative": (codes == 1).astype(float),
+            "neutral": (codes == 2).astype(float),
+        },
+        index=days,
+    )
+    return parts.groupby(level=0).sum()
+
+
+class DailySentimentAccumulator:
+    """
+    Incremental per-day sentiment statistics.
+    Only per-day sums are kept, so memory grows with the number of days, not
+    rows, and frames can be fed in chunks of any size.
+    """
+
+    def __init__(self, date_column="date"):
+        self.date_column = date_column
+        self._totals = pd.DataFrame(columns=_PARTIALS, index=pd.DatetimeIndex([]), dtype=float)
+
+    def update(self, df):
+        if df is None or df.empty:
+            return
+        self._totals = self._totals.add(_partials(df, self.date_column), fill_value=0)
+
+    def days(self):
+        return list(self._totals.index)
+
+    def pop(self, days):
+        """Remove the given days and return their finished statistics."""
+        days = self._totals.index.intersection(pd.to_datetime(days))
+        totals = self._totals.loc[days]
+        self._totals = self._totals.drop(days)
+        return totals
+
+    def totals(self):
+        return self._totals.sort_index()
+
+
+def stats_columns(totals, count_column, prefix):
+    """Mean, count, std and label shares from per-group sums, as a dict of arrays."""
+    n = totals["n"]
+    mean = totals["sum"] / n
+    variance = (totals["sum_sq"] - totals["sum"] * mean) / (n - 1)
+
+    return {
+        "average_signed_sentiment": mean.to_numpy(),
+        count_column: n.astype(int).to_numpy(),
+        f"{prefix}_sentiment_std": np.sqrt(variance.clip(lower=0)).where(n > 1).to_numpy(),
+        f"{prefix}_positive_share": (totals["positive"] / n).to_numpy(),
+        f"{prefix}_negative_share": (totals["negative"] / n).to_numpy(),
+        f"{prefix}_neutral_share": (totals["neutral"] / n).to_numpy(),
+    }
+
+
+def finalize_stats(totals, count_column, prefix):
+    """Turn per-day sums into the daily stats frame the scrapers return."""
+    totals = totals.sort_index()
+    return pd.DataFrame({"date": totals.index.date, **stats_columns(totals, count_column, prefix)})
+
+
+def totals_from_stats(stats, count_column, prefix):
+    """
+    Recover the per-row sums behind a daily stats frame (the inverse of
+    finalize_stats), so days can be re-bucketed and combined exactly.
+    """
+    n = stats[count_column].astype(float)
+    total = stats["average_signed_sentiment"] * n
+    variance = stats[f"{prefix}_sentiment_std"].fillna(0.0) ** 2
+    return pd.DataFrame(
+        {
+            "n": n,
+            "sum": total,
+            "sum_sq": variance * (n - 1) + total * stats["average_signed_sentiment"],
+            "positive": stats[f"{prefix}_positive_share"] * n,
+            "negative": stats[f"{prefix}_negative_share"] * n,
+            "neutral": stats[f"{prefix}_neutral_share"] * n,
+        },
+        index=stats.index,
+    )
+
+
+def daily_sentiment_stats(data, date_column, count_column, prefix):
+    """
+    Daily mean signed sentiment, volume, std and label distribution.
+    Args:
+        data: A scored DataFrame, or an iterable of DataFrame chunks.
+        date_column (str): Column holding the row timestamp or date.
+        count_column (str): Name for the per-day row count column.
+        prefix (str): Prefix for the std and label-share columns.
+    Returns:
+        DataFrame: One row per day with columns date,
+                   average_signed_sentiment, <count_column>,
+                   <prefix>_sentiment_std and <prefix>_{positive,negative,neutral}_share.
+    """
+    accumulator = DailySentimentAccumulator(date_column)
+    if isinstance(data, pd.DataFrame):
+        accumulator.update(data)
+    else:
+        for chunk in data:
+            accumulator.update(chunk)
+    return finalize_stats(accumulator.totals(), count_column, prefix)
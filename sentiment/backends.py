@@ -0,0 +1,156 @@
+import os
+import re
+import time
+
+import numpy as np
+
+BACKENDS = ("torch", "torch-dynamic-int8", "onnxruntime")
+ONNX_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "onnx")
+
+
+class TorchBackend:
+    """Run the Hugging Face model as-is (fp32), or dynamically quantized to int8."""
+
+    def __init__(self, model, quantize=False, num_threads=None):
+        import torch
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        model.eval()
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+        self.name = "torch-dynamic-int8" if quantize else "torch"
+
+    def predict(self, batch):
+        import torch
+
+        with torch.no_grad():
+            batch = {k: torch.as_tensor(v) for k, v in batch.items()}
+            return self.model(**batch).logits.float().numpy()
+
+
+class OnnxBackend:
+    """
+    Run an ONNX export of the model with onnxruntime. The graph is exported
+    once per (model, revision) and reused from ONNX_CACHE_DIR afterwards;
+    for local checkpoints the revision follows their weight files (see
+    sentiment.finbert.model_revision), so a retrained model is re-exported.
+    """
+
+    name = "onnxruntime"
+
+    def __init__(self, model, revision, num_threads=None):
+        import onnxruntime as ort
+
+        path = export_onnx(model, revision)
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def predict(self, batch):
+        feeds = {k: np.asarray(v, dtype=np.int64) for k, v in batch.items() if k in self.input_names}
+        return self.session.run(["logits"], feeds)[0]
+
+
+def export_onnx(model, revision):
+    """Export the model to ONNX with dynamic batch and sequence axes, if not cached yet."""
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "_", model.config.name_or_path)
+    path = os.path.join(ONNX_CACHE_DIR, f"{name}-{revision}.onnx")
+    if os.path.exists(path):
+        return path
+
+    import torch
+
+    print(f"📦 Exporting {model.config.name_or_path} to {path}...")
+    os.makedirs(ONNX_CACHE_DIR, exist_ok=True)
+    model.eval()
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dummy = tuple(torch.ones((1, 8), dtype=torch.long) for _ in input_names)
+    axes = {0: "batch", 1: "sequence"}
+    tmp_path = path + ".tmp"
+    torch.onnx.export(
+        model,
+        dummy,
+        tmp_path,
+        input_names=input_names,
+        output_names=["logits"],
+        dynamic_axes={**{n: axes for n in input_names}, "logits": {0: "batch"}},
+        opset_version=17,
+        dynamo=False,
+    )
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_backend(name, model, revision, num_threads=None):
+    """
+    Build an inference backend for a loaded model.
+    Args:
+        name (str): One of BACKENDS.
+        model: The Hugging Face sequence-classification model.
+        revision (str): Model revision, used to key the ONNX export.
+        num_threads (int): Intra-op threads; None keeps the library default.
+    """
+    if name == "torch":
+        return TorchBackend(model, num_threads=num_threads)
+    if name == "torch-dynamic-int8":
+        import copy
+
+        return TorchBackend(copy.deepcopy(model), quantize=True, num_threads=num_threads)
+    if name == "onnxruntime":
+        return OnnxBackend(model, revision, num_threads=num_threads)
+    raise ValueError(f"Unknown FinBERT backend '{name}', expected one of {BACKENDS}")
+
+
+def compare_backends(texts, candidates=("torch-dynamic-int8", "onnxruntime"), baseline="torch", batch_size=32, num_threads=None):
+    """
+    Score the same texts with every backend and report agreement with the
+    fp32 baseline, so the fastest backend within tolerance can be picked.
+    Returns:
+        dict: backend -> {"texts_per_second", "label_mismatch_rate",
+              "mean_score_delta", "max_score_delta"}. Deltas are absolute
+              differences in the probability of the baseline's label.
+    """
+    from sentiment.finbert import get_finbert_model, predict_probs
+
+    texts = [t for t in texts if isinstance(t, str) and t.strip()]
+    if not texts:
+        raise ValueError("compare_backends needs at least one non-empty text")
+    report = {}
+    baseline_probs = None
+
+    for name in (baseline,) + tuple(c for c in candidates if c != baseline):
+        classifier = get_finbert_model(backend=name, num_threads=num_threads)
+        predict_probs(classifier, texts[:batch_size], batch_size)  # warm-up
+        started = time.perf_counter()
+        probs = np.stack(predict_probs(classifier, texts, batch_size))
+        elapsed = time.perf_counter() - started
+
+        if baseline_probs is None:
+            baseline_probs = probs
+        labels = baseline_probs.argmax(axis=1)
+        rows = np.arange(len(texts))
+        delta = np.abs(probs[rows, labels] - baseline_probs[rows, labels])
+        report[name] = {
+            "texts_per_second": len(texts) / elapsed if elapsed else float("inf"),
+            "label_mismatch_rate": float((probs.argmax(axis=1) != labels).mean()),
+            "mean_score_delta": float(delta.mean()),
+            "max_score_delta": float(delta.max()),
+        }
+        print(f"⚖️ {name}: {report[name]}")
+
+    return report
+
+
+def choose_backend(report, max_mismatch_rate=0.01, max_score_delta=0.05):
+    """Pick the fastest backend in a compare_backends() report that stays within tolerance."""
+    within = [
+        (stats["texts_per_second"], name)
+        for name, stats in report.items()
+        if stats["label_mismatch_rate"] <= max_mismatch_rate and stats["max_score_delta"] <= max_score_delta
+    ]
+    return max(within)[1] if within else "torch"
@@ -0,0 +1,194 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "SENTIMENT_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "sentiment.sqlite"),
+)
+
+_SQLITE_CHUNK = 500
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different copies share a cache entry."""
+    return " ".join(str(text).split())
+
+
+def text_hash(text):
+    """sha256 of the normalized text, used as the content address."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class SentimentCache:
+    """
+    Persistent sentiment cache: an in-memory LRU in front of a SQLite table.
+    Entries are keyed by (text_hash, model_name, revision, max_length), so
+    changing any model setting naturally misses instead of serving stale
+    scores. The table is capped at max_entries; once over it, the least
+    recently used rows are evicted down to 90% of the cap, so the table is
+    only re-counted every tenth of the cap's worth of inserts.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, memory_size=50_000, max_entries=2_000_000):
+        self.path = path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sentiment (
+                text_hash TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                revision TEXT NOT NULL,
+                max_length INTEGER NOT NULL,
+                label TEXT NOT NULL,
+                score REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (text_hash, model_name, revision, max_length)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_last_used ON sentiment (last_used)")
+        self._conn.commit()
+        # Upper bound on the row count: every put adds its size, even for
+        # rows that replaced an existing entry, and only a recount lowers it
+        self._rows = self.size()
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, hashes, model_key):
+        """
+        Look up many text hashes for one model.
+        Args:
+            hashes (list): Text hashes from text_hash().
+            model_key (tuple): (model_name, revision, max_length).
+        Returns:
+            dict: text_hash -> {"label", "score"} for every hit.
+        """
+        found = {}
+        pending = []
+        with self._lock:
+            for h in dict.fromkeys(hashes):
+                value = self._memory.get((h,) + model_key)
+                if value is not None:
+                    self._memory.move_to_end((h,) + model_key)
+                    found[h] = value
+                else:
+                    pending.append(h)
+
+            now = time.time()
+            disk_hits = []
+            for start in range(0, len(pending), _SQLITE_CHUNK):
+                chunk = pending[start:start + _SQLITE_CHUNK]
+                rows = self._conn.execute(
+                    f"""
+                    SELECT text_hash, label, score FROM sentiment
+                    WHERE model_name = ? AND revision = ? AND max_length = ?
+                    AND text_hash IN ({",".join("?" * len(chunk))})
+                    """,
+                    (*model_key, *chunk),
+                ).fetchall()
+                for h, label, score in rows:
+                    value = {"label": label, "score": score}
+                    found[h] = value
+                    disk_hits.append((now, h, *model_key))
+                    self._remember((h,) + model_key, value)
+
+            if disk_hits:
+                self._conn.executemany(
+                    """
+                    UPDATE sentiment SET last_used = ?
+                    WHERE text_hash = ? AND model_name = ? AND revision = ? AND max_length = ?
+                    """,
+                    disk_hits,
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(pending) - len(disk_hits)
+        return found
+
+    def put_many(self, results, model_key):
+        """
+        Store freshly computed results in bulk and evict if over capacity.
+        Args:
+            results (dict): text_hash -> {"label", "score"}.
+            model_key (tuple): (model_name, revision, max_length).
+        """
+        if not results:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT OR REPLACE INTO sentiment
+                (text_hash, model_name, revision, max_length, label, score, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                [(h, *model_key, r["label"], r["score"], now) for h, r in results.items()],
+            )
+            for h, r in results.items():
+                self._remember((h,) + model_key, r)
+            self._rows += len(results)
+            if self._rows > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Other processes may share the file, so count exactly before deleting
+        self._rows = self._conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
+        if self._rows <= self.max_entries:
+            return
+        excess = self._rows - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM sentiment WHERE rowid IN (SELECT rowid FROM sentiment ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._rows -= excess
+
+    def size(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
+
+    def stats(self):
+        """Return hit/miss counters and the current number of stored entries."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self.size(),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_DEFAULT_CACHE = None
+_DEFAULT_CACHE_LOCK = threading.Lock()
+
+
+def get_sentiment_cache():
+    """Return the process-wide cache at DEFAULT_CACHE_PATH, opening it on first use."""
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        if _DEFAULT_CACHE is None:
+            _DEFAULT_CACHE = SentimentCache()
+        return _DEFAULT_CACHE
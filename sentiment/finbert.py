@@ -1,30 +1,341 @@
-from transformers import pipeline
-from huggingface_hub import login
+import math
 import os
+import re
+import threading
+import time
 
-login(os.getenv("HF_API_KEY"))
+import numpy as np
 
-def load_finbert_model():
+from instrumentation import incr, observe
+from sentiment.backends import TorchBackend, load_backend
+from sentiment.cache import get_sentiment_cache, text_hash
+
+MODEL_NAME = os.getenv("FINBERT_MODEL", "ProsusAI/finbert")
+MAX_LENGTH = 512
+# Inference backend: "torch", "torch-dynamic-int8" or "onnxruntime"
+BACKEND = os.getenv("FINBERT_BACKEND", "torch")
+NUM_THREADS = int(os.getenv("FINBERT_THREADS", "0")) or None
+# Texts longer than max_length are scored as up to this many sentence-aligned
+# windows and pooled; 1 keeps plain head truncation
+MAX_WINDOWS = int(os.getenv("FINBERT_MAX_WINDOWS", "8"))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Process-wide registry: one pipeline per (model_name, max_length, backend, num_threads)
+_MODEL_REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
+_HF_LOGGED_IN = False
+
+
+def hf_login():
+    """
+    Log in to the Hugging Face Hub using HF_API_KEY, once per process.
+    Does nothing when the variable is not set (public models don't need it).
+    """
+    global _HF_LOGGED_IN
+    token = os.getenv("HF_API_KEY")
+    if _HF_LOGGED_IN or not token:
+        return
+
+    from huggingface_hub import login
+
+    login(token)
+    _HF_LOGGED_IN = True
+
+
+def load_finbert_model(model_name=MODEL_NAME, max_length=MAX_LENGTH, backend=BACKEND, num_threads=NUM_THREADS):
     """
     Load the FinBERT sentiment analysis model.
+    This always builds a new pipeline; use get_finbert_model() to share one.
+    The batch API runs inference through `classifier.backend`.
     Returns:
         classifier: A sentiment analysis pipeline using the FinBERT model.
     """
-    model_name = "ProsusAI/finbert"
-    classifier = pipeline("sentiment-analysis", model=model_name, truncation=True, max_length=512)
+    from transformers import pipeline
+
+    hf_login()
+    classifier = pipeline("sentiment-analysis", model=model_name, truncation=True, max_length=max_length)
+    classifier.backend = load_backend(backend, classifier.model, model_revision(classifier), num_threads)
+    return classifier
+
+
+def get_finbert_model(model_name=MODEL_NAME, max_length=MAX_LENGTH, backend=BACKEND, num_threads=NUM_THREADS):
+    """
+    Return the shared FinBERT pipeline, loading it on first use.
+    Args:
+        model_name (str): Hugging Face model id or local path.
+        max_length (int): Maximum number of tokens per input.
+        backend (str): "torch", "torch-dynamic-int8" or "onnxruntime".
+        num_threads (int): Intra-op threads for the backend.
+    Returns:
+        classifier: The process-wide sentiment analysis pipeline.
+    """
+    key = (model_name, max_length, backend, num_threads)
+    with _REGISTRY_LOCK:
+        if key not in _MODEL_REGISTRY:
+            _MODEL_REGISTRY[key] = load_finbert_model(model_name, max_length, backend, num_threads)
+        return _MODEL_REGISTRY[key]
+
+
+def warm_up(model_name=MODEL_NAME, max_length=MAX_LENGTH, backend=BACKEND, num_threads=NUM_THREADS):
+    """
+    Load the shared model and run one dummy inference so the first real
+    call doesn't pay for lazy initialisation.
+    Returns:
+        classifier: The warmed-up shared pipeline.
+    """
+    classifier = get_finbert_model(model_name, max_length, backend, num_threads)
+    predict_probs(classifier, ["The market opened flat today."], max_length=max_length)
     return classifier
 
-def analyze_sentiment(text):
+
+def model_revision(classifier):
+    """
+    Return the Hub commit hash the pipeline was loaded from. A local
+    checkpoint has none, so it is identified by the size and mtime of its
+    weight files instead, and retraining it in place changes the revision.
+    """
+    config = classifier.model.config
+    commit = getattr(config, "_commit_hash", None)
+    if commit:
+        return commit
+    path = config.name_or_path
+    if os.path.isdir(path):
+        stats = [
+            (name, st.st_size, st.st_mtime_ns)
+            for name in sorted(os.listdir(path))
+            if name.endswith((".safetensors", ".bin", ".pt", ".ckpt"))
+            for st in [os.stat(os.path.join(path, name))]
+        ]
+        if stats:
+            import hashlib
+
+            return "local-" + hashlib.sha1(repr(stats).encode()).hexdigest()[:12]
+    return "unknown"
+
+
+def _cache_revision(classifier, max_windows=1):
+    # Non-default backends and chunked scoring give slightly different
+    # scores, so cache them apart
+    backend = getattr(classifier, "backend", None)
+    revision = model_revision(classifier)
+    if backend is not None and backend.name != "torch":
+        revision = f"{revision}+{backend.name}"
+    if max_windows > 1:
+        # "s" marks over-long sentences being split rather than truncated
+        revision = f"{revision}+w{max_windows}s"
+    return revision
+
+
+def analyze_sentiment(text, classifier=None, cache=None):
     """
     Analyze the sentiment of a given text using the FinBERT model.
     Args:
         text (str): The input text to analyze.
+        classifier: Optional pipeline handle; defaults to the shared model.
+        cache: Optional SentimentCache; defaults to the shared one, False disables it.
+    Returns:
+        dict: A dictionary containing the sentiment label and score,
+              or None if the text is NaN or empty.
+    """
+    return analyze_sentiment_batch([text], classifier=classifier, cache=cache)[0]
+
+
+def _is_missing(text):
+    if text is None:
+        return True
+    if isinstance(text, float) and math.isnan(text):
+        return True
+    return not str(text).strip()
+
+
+def _predict_probs(classifier, encodings, batch_size):
+    """
+    Run inference over pre-tokenized inputs, shortest first, so each batch is
+    only padded to its own longest member.
+    Returns a list of per-class probability arrays in the input order.
+    """
+    tokenizer = classifier.tokenizer
+    backend = getattr(classifier, "backend", None)
+    if backend is None:
+        # A pipeline built outside load_finbert_model: run it as plain torch
+        backend = classifier.backend = TorchBackend(classifier.model)
+
+    order = sorted(range(len(encodings)), key=lambda i: len(encodings[i]["input_ids"]))
+    probs = [None] * len(encodings)
+
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        batch = tokenizer.pad([encodings[i] for i in bucket], padding=True, return_tensors="np")
+        observe("sentiment_batch_size", len(bucket))
+        logits = backend.predict(dict(batch))
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        exp = np.exp(logits)
+        for i, row in zip(bucket, exp / exp.sum(axis=-1, keepdims=True)):
+            probs[i] = row
+
+    return probs
+
+
+def _tokenize(classifier, texts, max_length):
+    tokenized = classifier.tokenizer(texts, truncation=True, max_length=max_length)
+    return [
+        {key: tokenized[key][n] for key in tokenized.keys()}
+        for n in range(len(texts))
+    ]
+
+
+def _split_long_sentence(tokenizer, sentence, budget):
+    """
+    Cut a sentence longer than `budget` tokens into pieces of at most budget
+    tokens, at whitespace where possible so words are not split.
+    Returns a list of (piece text, token count).
+    """
+    offsets = tokenizer(sentence, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+    pieces, start = [], 0
+    while start < len(offsets):
+        end = min(start + budget, len(offsets))
+        cut = end
+        while end < len(offsets) and cut > start + 1 and offsets[cut][0] == offsets[cut - 1][1]:
+            cut -= 1
+        if cut > start + 1:
+            end = cut
+        pieces.append((sentence[offsets[start][0]:offsets[end - 1][1]], end - start))
+        start = end
+    return pieces
+
+
+def _split_windows(tokenizer, text, max_length, max_windows):
+    """
+    Pack whole sentences into windows of at most max_length tokens (special
+    tokens included), keeping the first max_windows windows. Sentences that
+    alone exceed a window are cut into window-sized pieces first (with a
+    fast tokenizer; otherwise they are truncated).
+    Returns (window texts, token count of each window).
+    """
+    budget = max_length - tokenizer.num_special_tokens_to_add()
+    # A token is rarely over 10 characters, so anything past this point
+    # could not land in a kept window; don't pay to tokenize it
+    sentences = _SENTENCE_END.split(text[:max_windows * budget * 10])
+    lengths = [len(ids) for ids in tokenizer(sentences, add_special_tokens=False)["input_ids"]]
+
+    parts = []
+    for sentence, length in zip(sentences, lengths):
+        if length > budget and getattr(tokenizer, "is_fast", False):
+            parts.extend(_split_long_sentence(tokenizer, sentence, budget))
+        else:
+            parts.append((sentence, length))
+
+    windows, sizes = [], []
+    current, size = [], 0
+    for sentence, length in parts:
+        if current and size + length > budget:
+            windows.append(" ".join(current))
+            sizes.append(min(size, budget))
+            if len(windows) == max_windows:
+                return windows, sizes
+            current, size = [], 0
+        current.append(sentence)
+        size += length
+    if current:
+        windows.append(" ".join(current))
+        sizes.append(min(size, budget))
+    return windows, sizes
+
+
+def predict_probs(classifier, texts, batch_size=32, max_length=MAX_LENGTH, max_windows=1):
+    """
+    Class probabilities for each text, in order, with no caching. Labels are
+    in classifier.model.config.id2label order.
+    With max_windows > 1, texts that don't fit in max_length tokens are split
+    into sentence-aligned windows that are scored in the same batches as
+    everything else, and their probabilities are averaged weighted by window
+    length.
+    """
+    if not texts:
+        return []
+    started = time.perf_counter()
+    incr("sentiment_texts_scored_total", len(texts))
+    encodings = _tokenize(classifier, texts, max_length)
+    if max_windows <= 1:
+        probs = _predict_probs(classifier, encodings, batch_size)
+        observe("sentiment_inference_seconds", time.perf_counter() - started)
+        return probs
+
+    # Inputs that filled max_length were (probably) truncated
+    windows = {}
+    for i, text in enumerate(texts):
+        if len(encodings[i]["input_ids"]) >= max_length:
+            window_texts, sizes = _split_windows(classifier.tokenizer, text, max_length, max_windows)
+            if len(window_texts) > 1:
+                start = len(encodings)
+                encodings.extend(_tokenize(classifier, window_texts, max_length))
+                windows[i] = (start, sizes)
+
+    probs = _predict_probs(classifier, encodings, batch_size)
+    for i, (start, sizes) in windows.items():
+        probs[i] = np.average(probs[start:start + len(sizes)], axis=0, weights=sizes)
+    incr("sentiment_windows_total", len(encodings) - len(texts))
+    observe("sentiment_inference_seconds", time.perf_counter() - started)
+    return probs[:len(texts)]
+
+
+def analyze_sentiment_batch(texts, batch_size=32, classifier=None, max_length=MAX_LENGTH, cache=None, max_windows=MAX_WINDOWS):
+    """
+    Analyze the sentiment of many texts at once using the FinBERT model.
+    Inputs are bucketed by token length and padded per batch instead of to
+    max_length, which is much faster than calling analyze_sentiment in a loop.
+    Args:
+        texts (list): The input texts to analyze.
+        batch_size (int): Number of texts per forward pass.
+        classifier: Optional pipeline handle; defaults to the shared model.
+        max_length (int): Maximum tokens per forward pass.
+        cache: Optional SentimentCache; defaults to the shared one, False disables it.
+        max_windows (int): Longer inputs are scored as up to this many
+                           sentence-aligned windows and pooled; 1 truncates.
     Returns:
-        dict: A dictionary containing the sentiment label and score.
+        list: One {"label", "score"} dict per input, in the original order.
+              NaN or empty inputs are skipped and come back as None.
     """
-    classifier = load_finbert_model()
-    result = classifier(text)[0]  # Pipeline handles truncation internally
-    return {"label": result["label"], "score": result["score"]}
+    if classifier is None:
+        classifier = get_finbert_model(max_length=max_length)
+    if cache is None:
+        cache = get_sentiment_cache()
+
+    texts = list(texts)
+    results = [None] * len(texts)
+    hashes = {i: text_hash(text) for i, text in enumerate(texts) if not _is_missing(text)}
+    if not hashes:
+        return results
+
+    model_key = (classifier.model.config.name_or_path, _cache_revision(classifier, max_windows), max_length)
+    cached = cache.get_many(list(hashes.values()), model_key) if cache else {}
+
+    # Identical texts are scored once, and only if the cache missed
+    todo = {}
+    for i, h in hashes.items():
+        if h not in cached and h not in todo:
+            todo[h] = str(texts[i])
+    if cache:
+        incr("sentiment_cache_hits_total", len(set(hashes.values())) - len(todo))
+        incr("sentiment_cache_misses_total", len(todo))
+
+    fresh = dict(zip(todo, _score_texts(classifier, list(todo.values()), batch_size, max_length, max_windows)))
+    if cache:
+        cache.put_many(fresh, model_key)
+
+    for i, h in hashes.items():
+        results[i] = cached.get(h) or fresh[h]
+    return results
+
+
+def _score_texts(classifier, texts, batch_size, max_length, max_windows):
+    id2label = classifier.model.config.id2label
+    scored = []
+    for probs in predict_probs(classifier, texts, batch_size, max_length, max_windows):
+        best = int(probs.argmax())
+        scored.append({"label": id2label[best], "score": float(probs[best])})
+    return scored
 
 
 # Example usage
@@ -32,4 +343,4 @@ def analyze_sentiment(text):
 #     sample_text = "The stock market is looking bullish today."
 #     sentiment = analyze_sentiment(sample_text)
 #     print(f"Text: {sample_text}")
-#     print(f"Sentiment: {sentiment['label']}, Score: {sentiment['score']:.4f}")
\ No newline at end of file
+#     print(f"Sentiment: {sentiment['label']}, Score: {sentiment['score']:.4f}")
@@ -0,0 +1,133 @@
+import hashlib
+import html
+import math
+import re
+import unicodedata
+
+import numpy as np
+
+# Syndication and scraping boilerplate that carries no sentiment
+BOILERPLATE_PATTERNS = [
+    r"<[^>]+>",
+    r"https?://\S+",
+    r"^\s*\(?(reuters|bloomberg|ap|zacks|benzinga|motley fool)\)?\s*[-–—:]\s*",
+    r"\[(removed|deleted)\]",
+    r"&amp;#x200b;|\u200b",
+]
+_BOILERPLATE = re.compile("|".join(f"(?:{p})" for p in BOILERPLATE_PATTERNS), re.IGNORECASE | re.MULTILINE)
+
+# Trailer phrases, removed only when they open a line or sentence (so "read
+# more closely" mid-sentence is kept) and up to the end of that sentence.
+# They run before the URL pattern, so a trailing link goes with them.
+TRAILER_PATTERNS = [
+    r"click here|read more|continue reading|see also",
+    r"this (article|story) (was )?(originally )?(published|appeared) (on|in|at)",
+]
+_TRAILERS = re.compile(
+    r"(?:^|(?<=[.!?]\s))[ \t]*(?:" + "|".join(f"(?:{p})" for p in TRAILER_PATTERNS) + r")\b[^\n]*?(?:[.!?](?=\s|$)|$)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Texts with fewer words than this are only collapsed on exact matches
+MIN_WORDS_FOR_SIMHASH = 8
+
+
+def clean_text(text):
+    """
+    Normalize a raw article or post: unescape HTML, apply NFKC, strip markup,
+    links and boilerplate, and collapse whitespace.
+    Returns None for missing or empty text.
+    """
+    if text is None or (isinstance(text, float) and math.isnan(text)):
+        return None
+    text = unicodedata.normalize("NFKC", html.unescape(str(text)))
+    text = _TRAILERS.sub(" ", text)
+    text = _BOILERPLATE.sub(" ", text)
+    text = " ".join(text.split())
+    return text or None
+
+
+def simhash(words):
+    """64-bit SimHash over word 3-shingles."""
+    shingles = [" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))]
+    digests = b"".join(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest() for s in shingles)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(len(shingles), 64)
+    votes = bits.sum(axis=0) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(votes).tobytes(), "big")
+
+
+class PreparedTexts:
+    """
+    Cleaned, de-duplicated texts plus the mapping back to the original rows.
+    Score `canonical` once, then expand() the results to every row.
+    """
+
+    def __init__(self, canonical, index):
+        self.canonical = canonical
+        self.index = index
+
+    def expand(self, results):
+        """Fan per-canonical results back out to the original rows (None for skipped rows)."""
+        return [results[i] if i is not None else None for i in self.index]
+
+
+def prepare_texts(texts, near_duplicates=True, max_distance=3):
+    """
+    Clean texts and collapse exact and near-duplicates to one canonical text.
+    Near-duplicates are found with SimHash: two texts whose fingerprints
+    differ in at most `max_distance` bits share a canonical text. The
+    fingerprint is split into max_distance + 1 bands, so any such pair has at
+    least one identical band and only same-band candidates are compared.
+    Args:
+        texts (list): Raw texts; NaN/None/empty rows are skipped.
+        near_duplicates (bool): Also collapse near-duplicates, not only exact ones.
+    Returns:
+        PreparedTexts
+    """
+    bands = max_distance + 1
+    band_bits = 64 // bands
+    band_mask = (1 << band_bits) - 1
+
+    canonical = []
+    index = []
+    exact = {}
+    fingerprints = []
+    buckets = {}
+
+    for text in texts:
+        cleaned = clean_text(text)
+        if cleaned is None:
+            index.append(None)
+            continue
+
+        key = cleaned.lower()
+        if key in exact:
+            index.append(exact[key])
+            continue
+
+        match = None
+        words = key.split()
+        fingerprint = None
+        if near_duplicates and len(words) >= MIN_WORDS_FOR_SIMHASH:
+            fingerprint = simhash(words)
+            band_keys = [(b, fingerprint >> (b * band_bits) & band_mask) for b in range(bands)]
+            for band_key in band_keys:
+                for candidate in buckets.get(band_key, ()):
+                    if bin(fingerprints[candidate] ^ fingerprint).count("1") <= max_distance:
+                        match = candidate
+                        break
+                if match is not None:
+                    break
+
+        if match is None:
+            match = len(canonical)
+            canonical.append(cleaned)
+            fingerprints.append(fingerprint)
+            if fingerprint is not None:
+                for band_key in band_keys:
+                    buckets.setdefault(band_key, []).append(match)
+
+        exact[key] = match
+        index.append(match)
+
+    return PreparedTexts(canonical, index)
@@ -0,0 +1,99 @@
+import re
+import threading
+
+# Words that signal the text needs a finance-aware model rather than a
+# general-purpose lexicon
+FINANCE_TERMS = re.compile(
+    r"\b(earnings|eps|revenue|guidance|margins?|outlook|forecast|downgraded?|upgraded?|"
+    r"price target|dividends?|buybacks?|valuation|p/e|ipo|merger|acquisition|sec|10-[kq]|"
+    r"q[1-4]|fy\d{2,4}|yoy|ebitda|debt|bonds?|yields?|rates?|fed|inflation|recession)\b",
+    re.IGNORECASE,
+)
+
+# Default escalation thresholds
+AMBIGUOUS_BELOW = 0.5
+MAX_VADER_WORDS = 64
+FINANCE_TERMS_MIN = 1
+
+_ANALYZER = None
+_ANALYZER_LOCK = threading.Lock()
+
+
+def _vader():
+    global _ANALYZER
+    with _ANALYZER_LOCK:
+        if _ANALYZER is None:
+            from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+            _ANALYZER = SentimentIntensityAnalyzer()
+        return _ANALYZER
+
+
+def vader_sentiment(text):
+    """
+    Score a text with VADER, mapped onto FinBERT's label/score contract:
+    the label follows the usual +/-0.05 compound cut-offs and the score is
+    |compound|.
+    """
+    compound = _vader().polarity_scores(text)["compound"]
+    if compound >= 0.05:
+        label = "positive"
+    elif compound <= -0.05:
+        label = "negative"
+    else:
+        label = "neutral"
+    return {"label": label, "score": abs(compound), "compound": compound}
+
+
+def needs_finbert(text, compound, ambiguous_below=AMBIGUOUS_BELOW, max_vader_words=MAX_VADER_WORDS, finance_terms_min=FINANCE_TERMS_MIN):
+    """True when VADER's result shouldn't be trusted for this text."""
+    if abs(compound) < ambiguous_below:
+        return True
+    if len(text.split()) > max_vader_words:
+        return True
+    return finance_terms_min is not None and len(FINANCE_TERMS.findall(text)) >= finance_terms_min
+
+
+def analyze_sentiment_tiered(texts, finbert_fn=None, ambiguous_below=AMBIGUOUS_BELOW, max_vader_words=MAX_VADER_WORDS, finance_terms_min=FINANCE_TERMS_MIN):
+    """
+    Score everything with VADER first and send only ambiguous, long or
+    finance-heavy texts to FinBERT.
+    Args:
+        texts (list): The input texts to analyze.
+        finbert_fn: Callable(list of texts) -> list of results for the
+                    escalated texts; defaults to analyze_sentiment_batch.
+        ambiguous_below (float): Escalate when |compound| is below this.
+        max_vader_words (int): Escalate texts longer than this many words.
+        finance_terms_min (int): Escalate texts with at least this many
+                                 finance terms; None disables the check.
+    Returns:
+        list: One {"label", "score", "tier"} dict per input ("vader" or
+              "finbert"), None for NaN or empty inputs.
+    """
+    if finbert_fn is None:
+        from sentiment.finbert import analyze_sentiment_batch
+
+        finbert_fn = analyze_sentiment_batch
+
+    results = [None] * len(texts)
+    escalate = []
+    for i, text in enumerate(texts):
+        if not isinstance(text, str) or not text.strip():
+            continue
+        vader = vader_sentiment(text)
+        if needs_finbert(text, vader["compound"], ambiguous_below, max_vader_words, finance_terms_min):
+            escalate.append(i)
+        else:
+            results[i] = {"label": vader["label"], "score": vader["score"], "tier": "vader"}
+
+    if escalate:
+        for i, result in zip(escalate, finbert_fn([texts[i] for i in escalate])):
+            results[i] = dict(result, tier="finbert") if result else None
+
+    print(f"🪜 Tiered scoring: {len(escalate)}/{len(texts)} texts escalated to FinBERT")
+    return results
+
+
+def tiered_score_fn(finbert_fn=None, **thresholds):
+    """Wrap a FinBERT score_fn so it can be passed wherever a score_fn is taken."""
+    return lambda texts: analyze_sentiment_tiered(texts, finbert_fn, **thresholds)
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from instrumentation import incr, stage, summary
+from sentiment.aggregation import DailySentimentAccumulator, finalize_stats
+from streaming import SOURCES
+
+POLL_SECONDS = float(os.getenv("SERVICE_POLL_SECONDS", "300"))
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8765"))
+# Days before today that are still polled and kept in memory; late articles
+# and posts keep arriving for yesterday
+LOOKBACK_DAYS = int(os.getenv("SERVICE_LOOKBACK_DAYS", "1"))
+
+
+def _item_keys(source, df):
+    """Stable identity of each fetched article or post, for skipping seen ones."""
+    fallback = df[SOURCES[source]["date_column"]].astype(str) + "|" + df["title"].fillna("").astype(str)
+    if "url" not in df.columns:
+        return fallback.tolist()
+    return df["url"].where(df["url"].notna(), fallback).astype(str).tolist()
+
+
+class SentimentService:
+    """
+    Long-running sentiment poller for a watchlist.
+    Every `interval` seconds the service fetches news and Reddit posts from
+    the last LOOKBACK_DAYS days for each ticker, scores only items it has
+    not seen before with a model loaded once at startup, and folds them into
+    per-day accumulators, so today's stats update in place. Fetches run on
+    worker threads, while scoring goes through a single thread that owns the
+    model. The latest stats are served as JSON over a local HTTP endpoint:
+        GET /stats            every ticker
+        GET /stats/<TICKER>   one ticker
+        GET /health, /metrics liveness and the run metrics summary
+    """
+
+    def __init__(self, tickers, api_key, subreddits, interval=POLL_SECONDS, host=SERVICE_HOST, port=SERVICE_PORT,
+                 lookback_days=LOOKBACK_DAYS, tiered_reddit=True, max_concurrent=4):
+        self.tickers = [t.upper() for t in tickers]
+        self.api_key = api_key
+        self.subreddits = subreddits
+        self.interval = interval
+        self.host = host
+        self.port = port
+        self.lookback_days = lookback_days
+        self.tiered_reddit = tiered_reddit
+        self.max_concurrent = max_concurrent
+        self.reddit_enabled = all(os.getenv(k) for k in ("REDDIT_CLIENT_ID", "REDDIT_CLIENT_SECRET", "REDDIT_USER_AGENT"))
+
+        self.classifier = None
+        self.polls = 0
+        self.started = datetime.now()
+        self._seen = {t: {source: {} for source in SOURCES} for t in self.tickers}
+        self._accumulators = {
+            t: {source: DailySentimentAccumulator(SOURCES[source]["date_column"]) for source in SOURCES}
+            for t in self.tickers
+        }
+        self._snapshots = {t: {"ticker": t, "updated": None, "news": [], "reddit": []} for t in self.tickers}
+        self._scorer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scorer")
+        self._server = None
+
+    def _window(self):
+        today = datetime.now().date()
+        return today - timedelta(days=self.lookback_days), today
+
+    def _fetch(self, source, ticker, start, end):
+        if source == "news":
+            from news_scraper import fetch_fmp_news
+
+            df, failed_windows = fetch_fmp_news(ticker, start.isoformat(), end.isoformat(), self.api_key)
+            for failure in failed_windows:
+                print(f"❌ {ticker}: news window {failure['from']}..{failure['to']} failed: {failure['error']}")
+            return df
+
+        from reddit_scraper import fetch_reddit_posts
+
+        # No per-day cap: every new post counts towards today's stats
+        return fetch_reddit_posts(
+            os.getenv("REDDIT_CLIENT_ID"), os.getenv("REDDIT_CLIENT_SECRET"), os.getenv("REDDIT_USER_AGENT"),
+            ticker, self.subreddits, datetime.combine(start, datetime.min.time()),
+            datetime.combine(end, datetime.min.time()), per_day_cap=None,
+        )
+
+    def _score(self, source, df):
+        from news_scraper import sentiment_news
+        from reddit_scraper import sentiment_reddit
+        from sentiment.finbert import analyze_sentiment_batch
+
+        def score_fn(texts):
+            return analyze_sentiment_batch(texts, classifier=self.classifier)
+
+        if source == "news":
+            return sentiment_news(df, score_fn=score_fn)
+        return sentiment_reddit(df, score_fn=score_fn, tiered=self.tiered_reddit)
+
+    async def poll_source(self, source, ticker):
+        """
+        Fetch one source for one ticker and fold any unseen items into its
+        daily stats.
+        Returns:
+            int: Number of new items scored.
+        """
+        loop = asyncio.get_running_loop()
+        start, end = self._window()
+        df = await asyncio.to_thread(self._fetch, source, ticker, start, end)
+        if df is None or df.empty:
+            return 0
+
+        seen = self._seen[ticker][source]
+        keys = _item_keys(source, df)
+        new = [key not in seen for key in keys]
+        df = df[new].reset_index(drop=True)
+        if df.empty:
+            return 0
+
+        scored = await loop.run_in_executor(self._scorer, self._score, source, df)
+        if scored is None or scored.empty:
+            return 0
+
+        # Rows without a label were not scored; leaving them unseen makes the
+        # next poll retry them
+        ok = scored["sentiment_label"].notna().to_numpy()
+        new_keys = [k for k, is_new in zip(keys, new) if is_new]
+        scored = scored[ok].reset_index(drop=True)
+        if scored.empty:
+            return 0
+
+        days = pd.to_datetime(scored[SOURCES[source]["date_column"]]).dt.normalize()
+        for key, day in zip([k for k, good in zip(new_keys, ok) if good], days):
+            seen[key] = day
+        self._accumulators[ticker][source].update(scored)
+        incr("service_items_scored_total", len(scored), source=source)
+        return len(scored)
+
+    def _expire(self, ticker):
+        """Drop stats and seen items for days that fell out of the lookback window."""
+        oldest = pd.Timestamp(self._window()[0])
+        for source in SOURCES:
+            accumulator = self._accumulators[ticker][source]
+            accumulator.pop([d for d in accumulator.days() if d < oldest])
+            seen = self._seen[ticker][source]
+            for key in [k for k, day in seen.items() if day < oldest]:
+                del seen[key]
+
+    def _snapshot(self, ticker):
+        snapshot = {"ticker": ticker, "updated": datetime.now().isoformat(timespec="seconds")}
+        for source, settings in SOURCES.items():
+            stats = finalize_stats(self._accumulators[ticker][source].totals(), settings["count_column"], source)
+            snapshot[source] = json.loads(stats.to_json(orient="records", date_format="iso"))
+            for row in snapshot[source]:
+                row["date"] = row["date"][:10]
+        self._snapshots[ticker] = snapshot
+
+    async def poll_ticker(self, ticker, limit):
+        sources = ["news"] + (["reddit"] if self.reddit_enabled else [])
+        async with limit:
+            results = await asyncio.gather(*(self.poll_source(s, ticker) for s in sources), return_exceptions=True)
+        for source, result in zip(sources, results):
+            if isinstance(result, Exception):
+                print(f"❌ {ticker}: {source} poll failed: {result}")
+                incr("service_poll_failures_total", source=source)
+            elif result:
+                print(f"🆕 {ticker}: {result} new {source} item(s) scored")
+        self._expire(ticker)
+        self._snapshot(ticker)
+
+    async def poll_once(self):
+        """Poll every ticker once, at most max_concurrent at a time."""
+        limit = asyncio.Semaphore(self.max_concurrent)
+        with stage("service_poll"):
+            await asyncio.gather(*(self.poll_ticker(t, limit) for t in self.tickers))
+        self.polls += 1
+
+    def stats(self, ticker=None):
+        if ticker is None:
+            return {"tickers": list(self._snapshots.values())}
+        return self._snapshots.get(ticker.upper())
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=10)
+            method, target = request.split(b"\r\n", 1)[0].decode("latin-1").split(" ")[:2]
+            path = target.split("?", 1)[0].rstrip("/")
+            status, body = 200, None
+            if method != "GET":
+                status, body = 405, {"error": "method not allowed"}
+            elif path == "/health":
+                body = {"status": "ok", "polls": self.polls, "started": self.started.isoformat(timespec="seconds")}
+            elif path == "/metrics":
+                body = summary()
+            elif path == "/stats":
+                body = self.stats()
+            elif path.startswith("/stats/"):
+                body = self.stats(path[len("/stats/"):])
+                if body is None:
+                    status, body = 404, {"error": "ticker not on the watchlist"}
+            else:
+                status, body = 404, {"error": "not found"}
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ValueError):
+            status, body = 400, {"error": "bad request"}
+
+        payload = json.dumps(body, default=str).encode()
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self):
+        """Load the model and start the HTTP endpoint."""
+        from sentiment.finbert import warm_up
+
+        with stage("load_model"):
+            self.classifier = await asyncio.get_running_loop().run_in_executor(self._scorer, warm_up)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"🛰️ Serving sentiment for {', '.join(self.tickers)} on http://{self.host}:{self.port}/stats")
+        if not self.reddit_enabled:
+            print("⚠️ Reddit credentials not set, polling news only")
+
+    async def run(self, polls=None):
+        """Poll every `interval` seconds until cancelled, or `polls` times."""
+        if self._server is None:
+            await self.start()
+        try:
+            while polls is None or self.polls < polls:
+                started = asyncio.get_running_loop().time()
+                await self.poll_once()
+                if polls is not None and self.polls >= polls:
+                    break
+                elapsed = asyncio.get_running_loop().time() - started
+                await asyncio.sleep(max(0.0, self.interval - elapsed))
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._scorer.shutdown(wait=False)
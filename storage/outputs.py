@@ -0,0 +1,147 @@
+import os
+
+import pandas as pd
+
+OUTPUT_DIR = os.getenv("OUTPUT_DIR", "output")
+OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "parquet")
+
+# Column used to derive the month partition for each dataset
+DATE_COLUMNS = {"news": "publishedDate", "reddit": "date", "final": "date"}
+
+
+def _dataset_path(dataset, fmt, base_dir):
+    return os.path.join(base_dir, f"{dataset}.{fmt}" if fmt == "parquet" else dataset)
+
+
+def _merge_days(existing, df, date_column):
+    """Keep the existing rows for days `df` does not cover, then add `df`."""
+    if existing is None or existing.empty:
+        return df
+    days = pd.to_datetime(df[date_column]).dt.normalize()
+    kept = existing[~pd.to_datetime(existing[date_column]).dt.normalize().isin(days)]
+    return pd.concat([kept, df], ignore_index=True).sort_values(date_column, kind="stable").reset_index(drop=True)
+
+
+def write_frame(df, dataset, ticker, fmt=OUTPUT_FORMAT, compression=None, base_dir=OUTPUT_DIR):
+    """
+    Write one ticker's frame to the columnar output store.
+    Parquet output is a hive-partitioned dataset (ticker=.../month=YYYY-MM/).
+    Re-writing a ticker replaces only the days present in `df`: rows stored
+    for other days, in the same month or elsewhere, are kept, so a re-run
+    over a narrower range loses nothing. Feather output is one file per
+    ticker, for fast whole-frame reloads, merged the same way.
+    Args:
+        df (DataFrame): Frame to write.
+        dataset (str): "news", "reddit", "final" or "features".
+        ticker (str): Ticker the rows belong to.
+        fmt (str): "parquet" or "feather".
+        compression (str): Codec; defaults to zstd for Parquet, lz4 for Feather.
+    Returns:
+        str: Path of the dataset directory or file written.
+    """
+    date_column = DATE_COLUMNS.get(dataset, "date")
+    path = _dataset_path(dataset, fmt, base_dir)
+
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        df = df.drop(columns=["ticker", "month"], errors="ignore")
+        # Every partition gets the schema of the whole frame, so a column that
+        # is all null in one month is not stored with a different type there
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        months = pd.to_datetime(df[date_column]).dt.strftime("%Y-%m")
+        for month, rows in df.groupby(months, sort=True):
+            directory = os.path.join(path, f"ticker={ticker}", f"month={month}")
+            existing = None
+            if os.path.isdir(directory) and any(n.endswith(".parquet") for n in os.listdir(directory)):
+                existing = pq.read_table(directory).to_pandas()
+            merged = _merge_days(existing, rows, date_column)
+            replace_partition(merged, dataset, ticker, month, compression=compression or "zstd", base_dir=base_dir,
+                              schema=schema)
+        return path
+
+    if fmt == "feather":
+        import pyarrow.feather as feather
+
+        os.makedirs(path, exist_ok=True)
+        filename = os.path.join(path, f"{ticker}.feather")
+        existing = feather.read_feather(filename) if os.path.exists(filename) else None
+        merged = _merge_days(existing, df.assign(ticker=ticker), date_column)
+        feather.write_feather(merged, filename, compression=compression or "lz4")
+        return filename
+
+    raise ValueError(f"Unsupported output format: {fmt}")
+
+
+def read_frame(dataset, ticker=None, fmt=OUTPUT_FORMAT, base_dir=OUTPUT_DIR, memory_map=True, months=None):
+    """
+    Read a dataset back, optionally for a single ticker.
+    Files are memory-mapped by default so large histories are not copied
+    through Python buffers. For Parquet, `months` (YYYY-MM strings) limits
+    the read to those partitions.
+    Returns:
+        DataFrame: The stored rows, with a 'ticker' column.
+    """
+    path = _dataset_path(dataset, fmt, base_dir)
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        filters = [("ticker", "=", ticker)] if ticker is not None else []
+        if months is not None:
+            filters.append(("month", "in", list(months)))
+        filters = filters or None
+        table = pq.read_table(path, filters=filters, memory_map=memory_map)
+        df = table.to_pandas()
+        df["ticker"] = df["ticker"].astype(str)
+        return df.drop(columns=["month"])
+
+    if fmt == "feather":
+        import pyarrow.feather as feather
+
+        if ticker is not None:
+            return feather.read_table(os.path.join(path, f"{ticker}.feather"), memory_map=memory_map).to_pandas()
+        frames = [
+            feather.read_table(os.path.join(path, name), memory_map=memory_map).to_pandas()
+            for name in sorted(os.listdir(path))
+            if name.endswith(".feather")
+        ]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    raise ValueError(f"Unsupported output format: {fmt}")
+
+
+def replace_partition(df, dataset, ticker, month, compression="zstd", base_dir=OUTPUT_DIR, schema=None):
+    """
+    Atomically replace one ticker/month partition of a Parquet dataset.
+    The file is written under a hidden temporary name (skipped by dataset
+    discovery) and moved into place with os.replace, so readers see either
+    the old partition or the new one, never a partial write.
+    Returns:
+        str: Path of the partition file.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    directory = os.path.join(_dataset_path(dataset, "parquet", base_dir), f"ticker={ticker}", f"month={month}")
+    os.makedirs(directory, exist_ok=True)
+    filename = os.path.join(directory, "part-0.parquet")
+    tmp_path = os.path.join(directory, f".part-0.parquet.{os.getpid()}.tmp")
+
+    table = pa.Table.from_pandas(df.drop(columns=["ticker", "month"], errors="ignore"), schema=schema, preserve_index=False)
+    pq.write_table(table, tmp_path, compression=compression)
+    os.replace(tmp_path, filename)
+    # Drop files left by earlier multi-file writes of this partition
+    for name in os.listdir(directory):
+        if name.endswith(".parquet") and name != "part-0.parquet":
+            os.remove(os.path.join(directory, name))
+    return filename
+
+
+def export_excel_report(df, filename):
+    """Opt-in Excel export for sharing a frame as a report."""
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    df.to_excel(filename, index=False)
+    print(f"✅ Excel report saved to {filename}")
+    return filename
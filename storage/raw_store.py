@@ -0,0 +1,204 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+DEFAULT_RAW_STORE_PATH = os.getenv("RAW_STORE_PATH", "data/raw_store.sqlite")
+
+
+def day_range(start_date, end_date):
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    return [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((end - start).days + 1)]
+
+
+class RawStore:
+    """
+    Local store for raw fetched records, keyed by (source, ticker, date).
+    A day is only marked committed once all of its records are written, in
+    the same transaction, so an interrupted run resumes from the last
+    committed day. Each (source, ticker) also keeps a high-water mark: the
+    latest day ever committed.
+    """
+
+    def __init__(self, path=DEFAULT_RAW_STORE_PATH):
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS raw_records (
+                source TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                date TEXT NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_raw_records_key ON raw_records (source, ticker, date);
+            CREATE TABLE IF NOT EXISTS committed_days (
+                source TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                date TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (source, ticker, date)
+            );
+            CREATE TABLE IF NOT EXISTS watermarks (
+                source TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                high_water TEXT NOT NULL,
+                PRIMARY KEY (source, ticker)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def watermark(self, source, ticker):
+        """Return the latest committed day for (source, ticker), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT high_water FROM watermarks WHERE source = ? AND ticker = ?", (source, ticker)
+            ).fetchone()
+        return row[0] if row else None
+
+    def committed_days(self, source, ticker, start_date, end_date):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date FROM committed_days WHERE source = ? AND ticker = ? AND date BETWEEN ? AND ?",
+                (source, ticker, start_date, end_date),
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def missing_days(self, source, ticker, start_date, end_date, refresh_days=2):
+        """
+        Days in [start_date, end_date] that still need fetching: never
+        committed, or within `refresh_days` of today (recent days may still
+        be receiving new articles and posts).
+        """
+        committed = self.committed_days(source, ticker, start_date, end_date)
+        refresh_from = (datetime.now() - timedelta(days=refresh_days)).strftime("%Y-%m-%d")
+        return [d for d in day_range(start_date, end_date) if d not in committed or d >= refresh_from]
+
+    def commit_days(self, source, ticker, days, df, date_column="date"):
+        """
+        Replace the stored records for `days` with the rows of `df` and mark
+        those days committed, atomically. Days with no rows are still
+        committed so they are not fetched again.
+        """
+        days = sorted(set(days))
+        if not days:
+            return
+
+        records = []
+        if df is not None and not df.empty:
+            row_days = pd.to_datetime(df[date_column]).dt.strftime("%Y-%m-%d")
+            in_scope = row_days.isin(days)
+            payloads = json.loads(df[in_scope].to_json(orient="records", date_format="iso"))
+            records = [(source, ticker, d, json.dumps(p)) for d, p in zip(row_days[in_scope], payloads)]
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM raw_records WHERE source = ? AND ticker = ? AND date = ?",
+                [(source, ticker, d) for d in days],
+            )
+            self._conn.executemany("INSERT INTO raw_records VALUES (?, ?, ?, ?)", records)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO committed_days VALUES (?, ?, ?, ?)",
+                [(source, ticker, d, now) for d in days],
+            )
+            self._conn.execute(
+                """
+                INSERT INTO watermarks VALUES (?, ?, ?)
+                ON CONFLICT (source, ticker) DO UPDATE SET high_water = MAX(high_water, excluded.high_water)
+                """,
+                (source, ticker, days[-1]),
+            )
+
+    def read(self, source, ticker, start_date, end_date):
+        """Return the stored records for a date range as a DataFrame."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT payload FROM raw_records
+                WHERE source = ? AND ticker = ? AND date BETWEEN ? AND ?
+                ORDER BY date, rowid
+                """,
+                (source, ticker, start_date, end_date),
+            ).fetchall()
+        return pd.DataFrame([json.loads(r[0]) for r in rows])
+
+    def months(self, source, tickers=None):
+        """
+        List the (ticker, "YYYY-MM") months that hold stored records.
+        Returns:
+            list: (ticker, month, record count) tuples, sorted.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT ticker, substr(date, 1, 7) AS month, COUNT(*) FROM raw_records
+                WHERE source = ? GROUP BY ticker, month ORDER BY ticker, month
+                """,
+                (source,),
+            ).fetchall()
+        return [r for r in rows if tickers is None or r[0] in tickers]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _runs(days, chunk_days):
+    """Group sorted day strings into contiguous runs of at most chunk_days."""
+    runs = []
+    for day in days:
+        previous = runs[-1][-1] if runs else None
+        contiguous = previous is not None and (
+            datetime.strptime(day, "%Y-%m-%d") - datetime.strptime(previous, "%Y-%m-%d")
+        ).days == 1
+        if contiguous and (chunk_days is None or len(runs[-1]) < chunk_days):
+            runs[-1].append(day)
+        else:
+            runs.append([day])
+    return runs
+
+
+def fetch_incremental(store, source, ticker, start_date, end_date, fetch_fn, date_column="date", chunk_days=7, refresh_days=2, stream=False):
+    """
+    Fetch only the missing (or recent) days of a range and return the full
+    range from the store.
+    Args:
+        store (RawStore): Where raw records and watermarks live.
+        source (str): Source name, e.g. "news", "reddit", "financials".
+        fetch_fn: Called as fetch_fn(run_start, run_end) with "YYYY-MM-DD"
+                  strings; returns (DataFrame, failed_days). Failed days are
+                  left uncommitted so the next run retries them.
+        chunk_days (int): Commit after every chunk of this many days;
+                          None fetches each contiguous gap in one call.
+        stream (bool): fetch_fn instead yields (DataFrame, days, failed_days)
+                       as parts of the run finish (e.g. concurrently fetched
+                       windows), and each part is committed as it arrives.
+    Returns:
+        DataFrame: Stored records for [start_date, end_date].
+    """
+    missing = store.missing_days(source, ticker, start_date, end_date, refresh_days)
+    print(f"🗄️ {source}/{ticker}: {len(missing)} day(s) to fetch, watermark {store.watermark(source, ticker)}")
+
+    for run in _runs(missing, chunk_days):
+        if stream:
+            parts = fetch_fn(run[0], run[-1])
+        else:
+            df, failed_days = fetch_fn(run[0], run[-1])
+            parts = [(df, run, failed_days)]
+        for df, days, failed_days in parts:
+            failed_days = set(failed_days)
+            done = [d for d in days if d in run and d not in failed_days]
+            store.commit_days(source, ticker, done, df, date_column)
+
+    return store.read(source, ticker, start_date, end_date)
@@ -0,0 +1,103 @@
+import queue
+import threading
+
+from news_scraper import iter_fmp_news
+from reddit_scraper import reddit_texts
+from sentiment.aggregation import DailySentimentAccumulator, finalize_stats
+from sentiment.finbert import analyze_sentiment_batch, get_finbert_model
+from sentiment.preprocess import prepare_texts
+from sentiment.tiered import tiered_score_fn
+
+# Per-source settings for turning scored rows into daily stats
+SOURCES = {
+    "news": {"date_column": "publishedDate", "count_column": "num_articles"},
+    "reddit": {"date_column": "date", "count_column": "reddit_post_volume"},
+}
+
+_DONE = object()
+
+
+def news_producer(symbol, start_date, end_date, api_key, **kwargs):
+    """Adapt iter_fmp_news to the (frame, completed_days) producer protocol."""
+    for frame, days, failed_windows in iter_fmp_news(symbol, start_date, end_date, api_key, **kwargs):
+        for failure in failed_windows:
+            print(f"❌ News window {failure['from']}..{failure['to']} failed: {failure['error']}")
+        yield frame, days
+
+
+def _produce(source, producer, out):
+    try:
+        for frame, completed_days in producer:
+            out.put((source, frame, completed_days))  # blocks while the queue is full
+    except Exception as e:
+        print(f"❌ {source} producer failed: {e}")
+    finally:
+        out.put((source, _DONE, None))
+
+
+def _texts(source, frame):
+    return frame["text"] if source == "news" else reddit_texts(frame)
+
+
+def stream_sentiment(producers, classifier=None, queue_size=8, micro_batch=64, sink=None, tiered=()):
+    """
+    Score and aggregate sources as they are fetched.
+    Every producer runs on its own thread and feeds a bounded queue, so
+    fetching stops when scoring falls behind. This thread scores each chunk in
+    micro-batches and folds it into a per-day accumulator. Only per-day sums
+    are kept, so memory does not grow with the window length.
+    Args:
+        producers (dict): source -> iterator of (frame, completed_days), where
+                          completed_days are "YYYY-MM-DD" days that will get
+                          no more rows. Sources must be keys of SOURCES.
+        classifier: Optional pipeline handle; defaults to the shared model.
+        queue_size (int): Maximum chunks buffered between fetch and scoring.
+        micro_batch (int): Texts per analyze_sentiment_batch call.
+        sink: Optional callable(source, scored_frame) to persist raw rows.
+        tiered (tuple): Sources scored through the VADER fast path, as
+                        sentiment_reddit(tiered=True) does; the
+                        'sentiment_tier' column records the model used.
+    Yields:
+        tuple: (source, daily stats DataFrame for days that just finished)
+    """
+    if classifier is None:
+        classifier = get_finbert_model()
+
+    chunks = queue.Queue(maxsize=queue_size)
+    for source, producer in producers.items():
+        threading.Thread(target=_produce, args=(source, producer, chunks), daemon=True).start()
+
+    def finbert_fn(texts):
+        scored = []
+        for start in range(0, len(texts), micro_batch):
+            scored.extend(analyze_sentiment_batch(texts[start:start + micro_batch], batch_size=micro_batch, classifier=classifier))
+        return scored
+
+    score_fns = {source: tiered_score_fn(finbert_fn) if source in tiered else finbert_fn for source in producers}
+    accumulators = {source: DailySentimentAccumulator(SOURCES[source]["date_column"]) for source in producers}
+    running = set(producers)
+
+    while running:
+        source, frame, completed_days = chunks.get()
+        accumulator = accumulators[source]
+
+        if frame is _DONE:
+            # Whatever is left for this source can no longer change
+            running.discard(source)
+            completed_days = accumulator.days()
+        elif not frame.empty:
+            prepared = prepare_texts(_texts(source, frame).tolist())
+            results = prepared.expand(score_fns[source](prepared.canonical))
+            frame = frame.assign(
+                sentiment_score=[r['score'] if r else None for r in results],
+                sentiment_label=[r['label'] if r else None for r in results],
+                sentiment_tier=[r.get('tier', 'finbert') if r else None for r in results],
+            )
+            accumulator.update(frame)
+            if sink is not None:
+                sink(source, frame)
+
+        if completed_days:
+            finished = accumulator.pop(completed_days)
+            if not finished.empty:
+                yield source, finalize_stats(finished, SOURCES[source]["count_column"], prefix=source)
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import financials_scraper
+from main import fetch_financials_incremental
+from storage.raw_store import RawStore
+
+
+def fake_history(endpoint, ticker, start_date, end_date, api_key, cache=None):
+    # One record per weekday, like FMP's EOD endpoints; weekends come back empty
+    day = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    records = []
+    while day <= end:
+        if day.weekday() < 5:
+            records.append({"date": day.strftime("%Y-%m-%d"), "adjClose": 100.0 + day.day, "marketCap": 1e12})
+        day += timedelta(days=1)
+    return records[::-1]
+
+
+def test_weekend_only_gap_is_committed_empty(monkeypatch):
+    monkeypatch.setattr(financials_scraper, "fetch_fmp_history", fake_history)
+    store = RawStore(":memory:")
+
+    first = fetch_financials_incremental(store, "AAPL", "2025-06-02", "2025-06-06", "key")
+    assert len(first) == 5
+
+    # 06-07 and 06-08 are a Saturday and a Sunday
+    extended = fetch_financials_incremental(store, "AAPL", "2025-06-02", "2025-06-08", "key")
+    assert len(extended) == 5
+    assert store.missing_days("financials", "AAPL", "2025-06-07", "2025-06-08", refresh_days=0) == []
+    assert extended["stock_return"].notna().sum() == 4
+
+
+def test_empty_price_response_still_raises_outside_incremental(monkeypatch):
+    monkeypatch.setattr(financials_scraper, "fetch_fmp_history", lambda *args, **kwargs: [])
+    with pytest.raises(ValueError):
+        financials_scraper.fetch_stock_price("AAPL", "2025-06-07", "2025-06-08", "key")
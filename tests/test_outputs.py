@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+from storage.outputs import read_frame, write_frame
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather"])
+def test_narrower_rerun_keeps_other_days(tmp_path, fmt):
+    full = pd.DataFrame({"date": pd.date_range("2025-01-01", "2025-01-31"), "value": 1.0})
+    write_frame(full, "final", "AAPL", fmt=fmt, base_dir=str(tmp_path))
+
+    # A mid-month re-run only covers eleven days
+    rerun = pd.DataFrame({"date": pd.date_range("2025-01-10", "2025-01-20"), "value": 2.0})
+    write_frame(rerun, "final", "AAPL", fmt=fmt, base_dir=str(tmp_path))
+
+    stored = read_frame("final", "AAPL", fmt=fmt, base_dir=str(tmp_path))
+    assert len(stored) == 31
+    assert stored["date"].is_monotonic_increasing
+    assert (stored["value"] == 2.0).sum() == 11
+
+
+def test_rewrite_leaves_other_tickers_alone(tmp_path):
+    frame = pd.DataFrame({"date": pd.date_range("2025-01-01", "2025-02-28"), "value": 1.0})
+    write_frame(frame, "final", "AAPL", base_dir=str(tmp_path), fmt="parquet")
+    write_frame(frame, "final", "MSFT", base_dir=str(tmp_path), fmt="parquet")
+    write_frame(frame.head(5), "final", "AAPL", base_dir=str(tmp_path), fmt="parquet")
+
+    stored = read_frame("final", base_dir=str(tmp_path), fmt="parquet")
+    assert stored.groupby("ticker").size().to_dict() == {"AAPL": 59, "MSFT": 59}
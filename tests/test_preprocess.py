@@ -0,0 +1,23 @@
+import pytest
+
+from sentiment.preprocess import clean_text
+
+
+@pytest.mark.parametrize("text", [
+    "Fed holds rates; see also the Fed's statement. Stocks rallied.",
+    "Analysts urged investors to read more closely into guidance, warning of margin pressure",
+    "Traders who click here and there on apps trade more often.",
+])
+def test_mid_sentence_phrases_are_kept(text):
+    assert clean_text(text) == text
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Shares rose 3%. Read more at https://x.com.", "Shares rose 3%."),
+    ("Shares rose 3%. Read more at https://x.com. Bonds fell.", "Shares rose 3%. Bonds fell."),
+    ("Great quarter!\nClick here to subscribe\nMargins widened.", "Great quarter! Margins widened."),
+    ("Apple beat estimates. This article was originally published on Yahoo Finance.", "Apple beat estimates."),
+    ("Revenue grew 5.2% in Q3. See also the 10-K. Margins widened.", "Revenue grew 5.2% in Q3. Margins widened."),
+])
+def test_trailers_are_stripped(text, expected):
+    assert clean_text(text) == expected
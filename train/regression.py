@@ -1,20 +1,15 @@
 # stock_regression.py
 
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import statsmodels.api as sm
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, r2_score
-
-# Load dataset (adjust relative path for Codespaces or Colab)
-df = pd.read_excel("data/AAPL_final_data.xlsx")  # <-- ensure the file is in the right location
+import hashlib
+import os
+import sys
+from collections import OrderedDict
 
-# Drop missing rows
-df.dropna(inplace=True)
+import numpy as np
+import pandas as pd
 
 # Define features and target
-features = [
+FEATURES = [
     "news_sentiment",
     "num_articles",
     "reddit_sentiment",
@@ -22,41 +17,211 @@ features = [
     "market_cap",
     "time"
 ]
+TARGET = "stock_return"
+
+# Walk-forward defaults: first fit on MIN_TRAIN_DAYS, then predict the next
+# TEST_DAYS and roll forward; TRAIN_WINDOW_DAYS=0 keeps the window expanding
+MIN_TRAIN_DAYS = int(os.getenv("MIN_TRAIN_DAYS", "20"))
+TEST_DAYS = int(os.getenv("TEST_DAYS", "5"))
+TRAIN_WINDOW_DAYS = int(os.getenv("TRAIN_WINDOW_DAYS", "0"))
+
+# Design matrices kept between calls, keyed by the content of their columns
+_DESIGN_CACHE = OrderedDict()
+_DESIGN_CACHE_SIZE = 256
+
+
+class Design:
+    """
+    One ticker's regression inputs, built once and reused by every fold.
+    Features are standardized with the column mean/std, which only improves
+    conditioning: OLS predictions with an intercept are unchanged by it, so
+    no information from the test days reaches the fit. `gram` and `moment`
+    hold prefix sums of x x^T and x y, so the normal equations of any
+    contiguous training window are a difference of two rows.
+    """
+
+    def __init__(self, df, features, target):
+        rows = df.dropna(subset=features + [target])
+        values = rows[features].to_numpy(dtype=float)
+        self.mean = values.mean(axis=0)
+        self.std = values.std(axis=0)
+        self.std[self.std == 0] = 1.0
+
+        self.X = np.column_stack([np.ones(len(rows)), (values - self.mean) / self.std])
+        self.y = rows[target].to_numpy(dtype=float)
+        k = self.X.shape[1]
+        self.gram = np.concatenate([np.zeros((1, k, k)), np.cumsum(self.X[:, :, None] * self.X[:, None, :], axis=0)])
+        self.moment = np.concatenate([np.zeros((1, k)), np.cumsum(self.X * self.y[:, None], axis=0)])
+
+    def __len__(self):
+        return len(self.y)
+
+    def coefficients(self, beta, features):
+        """Map standardized coefficients back to the original feature units."""
+        slopes = beta[1:] / self.std
+        return {"const": float(beta[0] - slopes @ self.mean), **dict(zip(features, map(float, slopes)))}
+
+
+def design_matrix(df, features=FEATURES, target=TARGET):
+    """
+    Build (or fetch from the cache) the design matrix for one ticker's rows.
+    Rows are dropped only when a feature or the target is missing.
+    Returns:
+        Design
+    """
+    columns = [c for c in ["date", *features, target] if c in df.columns]
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df[columns], index=False).to_numpy().tobytes()).hexdigest()
+    key = (tuple(features), target, digest)
+    if key in _DESIGN_CACHE:
+        _DESIGN_CACHE.move_to_end(key)
+        return _DESIGN_CACHE[key]
+
+    design = Design(df, list(features), target)
+    _DESIGN_CACHE[key] = design
+    while len(_DESIGN_CACHE) > _DESIGN_CACHE_SIZE:
+        _DESIGN_CACHE.popitem(last=False)
+    return design
+
+
+def walk_forward_folds(n, min_train=MIN_TRAIN_DAYS, test_size=TEST_DAYS, window=TRAIN_WINDOW_DAYS):
+    """
+    Split n time-ordered rows into walk-forward folds. Training always ends
+    before the test days start, so no future row is used for a fit.
+    Args:
+        window (int): Train on the last `window` rows only; 0 expands.
+    Returns:
+        list: (train_start, train_end, test_end) row positions, half-open.
+    """
+    folds = []
+    for train_end in range(min_train, n, test_size):
+        train_start = max(0, train_end - window) if window else 0
+        folds.append((train_start, train_end, min(train_end + test_size, n)))
+    return folds
+
+
+def fit_batch(designs, windows):
+    """
+    Fit OLS on many (design, train_start, train_end) windows at once: the
+    normal equations are stacked and solved with one batched pseudo-inverse,
+    which also copes with collinear or constant features.
+    Returns:
+        ndarray: One coefficient row per window.
+    """
+    gram = np.stack([designs[i].gram[end] - designs[i].gram[start] for i, start, end in windows])
+    moment = np.stack([designs[i].moment[end] - designs[i].moment[start] for i, start, end in windows])
+    return np.einsum("bij,bj->bi", np.linalg.pinv(gram, hermitian=True), moment)
+
+
+def _scores(y_true, y_pred):
+    if len(y_true) == 0:
+        return {"r2": float("nan"), "rmse": float("nan"), "n": 0}
+    residual = float(np.sum((y_true - y_pred) ** 2))
+    total = float(np.sum((y_true - y_true.mean()) ** 2))
+    return {
+        "r2": 1 - residual / total if total else float("nan"),
+        "rmse": float(np.sqrt(residual / len(y_true))),
+        "n": int(len(y_true)),
+    }
+
+
+def save_graph(y_true, y_pred, path):
+    """Save an actual vs predicted scatter plot without opening a window."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    low, high = float(np.min(y_true)), float(np.max(y_true))
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.scatter(y_true, y_pred, alpha=0.7, color='dodgerblue')
+    ax.plot([low, high], [low, high], 'r--')
+    ax.set_xlabel("Actual Stock Return")
+    ax.set_ylabel("Predicted Stock Return")
+    ax.set_title("Walk-forward Actual vs Predicted Stock Returns")
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+def train_model(mega_df, save_graph_path=None, features=FEATURES, target=TARGET, min_train=MIN_TRAIN_DAYS,
+                test_size=TEST_DAYS, window=TRAIN_WINDOW_DAYS, by="ticker"):
+    """
+    Walk-forward OLS of daily stock returns on sentiment and market features.
+    Each ticker is fitted on its past days and scored on the next test_size
+    days, rolling forward through the history. Every fold of every ticker,
+    plus one final fit per ticker on all its rows, is solved in one batch.
+    Args:
+        mega_df (DataFrame): Daily rows from create_mega_df / the "final"
+                             dataset, optionally many tickers in a `by` column.
+        save_graph_path (str): Save an actual vs predicted plot here.
+        features (list): Feature columns; missing ones are skipped.
+        min_train, test_size, window (int): See walk_forward_folds.
+    Returns:
+        tuple: (performance dict with out-of-sample 'r2' and 'rmse', the
+                prediction count, per-ticker scores and final coefficients;
+                path of the saved graph or None)
+    """
+    missing = [f for f in features if f not in mega_df.columns]
+    if missing:
+        print(f"⚠️ Skipping missing feature(s): {', '.join(missing)}")
+    features = [f for f in features if f in mega_df.columns]
+    if not features:
+        raise ValueError("None of the features are in the DataFrame")
+
+    groups = mega_df.groupby(by, sort=True) if by in mega_df.columns else [(None, mega_df)]
+    tickers, designs = [], []
+    for ticker, rows in groups:
+        rows = rows.sort_values("date") if "date" in rows else rows
+        design = design_matrix(rows, features, target)
+        if len(design) <= min_train:
+            print(f"⚠️ {ticker or 'Ticker'}: only {len(design)} complete row(s), need more than {min_train}")
+            continue
+        tickers.append(ticker)
+        designs.append(design)
+    if not designs:
+        raise ValueError("Not enough complete rows to train on")
+
+    folds = [(i, fold) for i, d in enumerate(designs) for fold in walk_forward_folds(len(d), min_train, test_size, window)]
+    windows = [(i, start, end) for i, (start, end, _) in folds] + [(i, 0, len(d)) for i, d in enumerate(designs)]
+    betas = fit_batch(designs, windows)
+
+    y_true = [[] for _ in designs]
+    y_pred = [[] for _ in designs]
+    for beta, (i, (_, train_end, test_end)) in zip(betas, folds):
+        design = designs[i]
+        y_true[i].append(design.y[train_end:test_end])
+        y_pred[i].append(design.X[train_end:test_end] @ beta)
+    y_true = [np.concatenate(parts) for parts in y_true]
+    y_pred = [np.concatenate(parts) for parts in y_pred]
+
+    all_true, all_pred = np.concatenate(y_true), np.concatenate(y_pred)
+    performance = _scores(all_true, all_pred)
+    performance["folds"] = len(folds)
+    performance["per_ticker"] = {
+        ticker: {**_scores(t, p), "coefficients": design.coefficients(beta, features)}
+        for ticker, design, t, p, beta in zip(tickers, designs, y_true, y_pred, betas[len(folds):])
+    }
+
+    graph_path = save_graph(all_true, all_pred, save_graph_path) if save_graph_path else None
+    return performance, graph_path
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from storage.outputs import read_frame
+
+    # Load dataset from the columnar output store (memory-mapped)
+    df = read_frame("final", "AAPL").drop(columns=["ticker"])
+    performance, graph_path = train_model(df, save_graph_path="data/model_performance_graph.png")
 
-X = df[features]
-y = df["stock_return"]
-
-# Add constant (intercept term)
-X = sm.add_constant(X)
-
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
-
-# Train model
-model = sm.OLS(y_train, X_train).fit()
-
-# Predict
-y_pred = model.predict(X_test)
-
-# Evaluate
-r2 = r2_score(y_test, y_pred)
-rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-
-# Output results
-print("✅ Model trained!")
-print(f"R² Score: {r2:.4f}")
-print(f"RMSE: {rmse:.6f}\n")
-print(model.summary())
-
-# Plot
-plt.figure(figsize=(10, 6))
-plt.scatter(y_test, y_pred, alpha=0.7, color='dodgerblue')
-plt.plot([y.min(), y.max()], [y.min(), y.max()], 'r--')
-plt.xlabel("Actual Stock Return")
-plt.ylabel("Predicted Stock Return")
-plt.title("📈 Actual vs Predicted Stock Returns")
-plt.grid(True)
-plt.tight_layout()
-plt.show()
+    # Output results
+    print("✅ Model trained!")
+    print(f"R² Score: {performance['r2']:.4f}")
+    print(f"RMSE: {performance['rmse']:.6f}\n")
+    for name, value in performance["per_ticker"][None]["coefficients"].items():
+        print(f"{name:>20}: {value: .6g}")
+    print(f"Graph saved at: {graph_path}")